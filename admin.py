@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
 
 from .models import User
+from .search import search_users
 
 
 @admin.register(User)
@@ -45,5 +46,9 @@ class UserAdmin(DjangoUserAdmin):
             },
         ),
     )
+    # Kept so the admin shows its search box; matching goes through search_users.
     search_fields = ("username", "email")
     ordering = ("username",)
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_users(queryset, search_term), False
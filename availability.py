@@ -0,0 +1,222 @@
+# user/availability.py
+"""
+Username availability checks backed by an in-process Bloom filter.
+
+The filter holds every existing username, so a "definitely not taken" answer
+needs no database access; only possible positives fall through to the
+indexed ``username`` lookup. It is fed by the ``User`` post_save receiver and
+caught up every ``REFRESH_INTERVAL`` seconds with one ``id > last_seen``
+query, so rows created by other processes show up. Rows only renamed by other
+processes (or by queryset ``update()``) keep their id, so the filter is also
+rebuilt from scratch every ``FULL_REBUILD_INTERVAL`` seconds.
+Deleted or renamed-away usernames stay in the filter until then and simply
+cost a DB lookup.
+
+Builds run in a background thread; until the first one finishes every check
+goes to the database. Catch-ups run in the request that finds one due.
+
+The answer is advisory: registration still enforces uniqueness. A name taken
+by another process may be reported as free for up to ``REFRESH_INTERVAL``
+seconds, or ``FULL_REBUILD_INTERVAL`` seconds if it was taken by a rename.
+
+Sizing (``m = -n ln p / ln(2)^2`` bits, ``k = m/n ln 2`` hashes) at p = 1%:
+
+    usernames      filter size   hashes
+    100,000        117 KiB       7
+    1,000,000      1.14 MiB      7
+    10,000,000     11.4 MiB      7
+
+For comparison a Python ``set`` of 1M short usernames takes roughly 90 MiB.
+"""
+
+import hashlib
+import math
+import threading
+import time
+
+from django.db import connection
+
+from .models import User
+
+FALSE_POSITIVE_RATE = 0.01
+REFRESH_INTERVAL = 5.0
+FULL_REBUILD_INTERVAL = 300.0
+# Spare capacity so the filter keeps its error rate while new users arrive.
+GROWTH_FACTOR = 1.5
+MIN_CAPACITY = 10_000
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=FALSE_POSITIVE_RATE):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + index * second) % self.size for index in range(self.hashes))
+
+    def add(self, value, counted=True):
+        """``counted=False`` sets the bits without using up capacity."""
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        if counted:
+            self.count += 1
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class UsernameIndex:
+    """
+    Builds run in a background thread and catch-up queries outside
+    ``_lock``, one at a time; other requests keep reading the current filter
+    meanwhile, or go to the database while the first build is still running.
+    A full rebuild swaps the new filter in once it is ready.
+
+    Only catch-up rows count towards a filter's capacity. ``add()`` sets bits
+    without counting, since the next catch-up reads the same row again, and
+    names added during a build are replayed into the new filter.
+    """
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL, rebuild_interval=FULL_REBUILD_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        # Guards the fields below; never held across a query.
+        self._lock = threading.Lock()
+        self._filter = None
+        self._last_id = 0
+        self._refreshed_at = 0.0
+        # None when the next check should start a rebuild.
+        self._built_at = None
+        self._refreshing = False
+        self._pending = None
+        self._generation = 0
+
+    def _build(self):
+        last_id = User.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+        capacity = max(User.objects.count() * GROWTH_FACTOR, MIN_CAPACITY)
+        bloom = BloomFilter(capacity)
+        rows = (
+            User.objects.filter(pk__lte=last_id)
+            .values_list("username", flat=True)
+            .iterator(chunk_size=10_000)
+        )
+        for username in rows:
+            bloom.add(username)
+        return bloom, last_id
+
+    def _swap_in(self, generation, bloom, last_id):
+        with self._lock:
+            if generation != self._generation:
+                return
+            for username in self._pending or ():
+                bloom.add(username, counted=False)
+            self._filter, self._last_id = bloom, last_id
+            self._built_at = time.monotonic()
+
+    def _finish_refresh(self):
+        with self._lock:
+            self._refreshing = False
+            self._pending = None
+            self._refreshed_at = time.monotonic()
+
+    def _rebuild(self, generation):
+        try:
+            self._swap_in(generation, *self._build())
+        finally:
+            self._finish_refresh()
+
+    def _start_rebuild(self, generation):
+        def run():
+            try:
+                self._rebuild(generation)
+            finally:
+                # The thread's own connection; nothing reuses it afterwards.
+                connection.close()
+
+        threading.Thread(target=run, name="username-index-build", daemon=True).start()
+
+    def _catch_up(self, generation, last_id):
+        rows = list(
+            User.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", "username")
+        )
+        with self._lock:
+            if generation != self._generation:
+                return
+            for _pk, username in rows:
+                self._filter.add(username)
+            if rows:
+                self._last_id = rows[-1][0]
+            if self._filter.count > self._filter.capacity:
+                # Past capacity the error rate climbs; rebuild at the new size
+                # while the current filter keeps answering.
+                self._built_at = None
+
+    def _ready_filter(self):
+        with self._lock:
+            bloom = self._filter
+            if self._refreshing:
+                return bloom
+            now = time.monotonic()
+            rebuild = (
+                bloom is None
+                or self._built_at is None
+                or now - self._built_at >= self.rebuild_interval
+            )
+            if not rebuild and now - self._refreshed_at < self.refresh_interval:
+                return bloom
+            self._refreshing = True
+            generation, last_id = self._generation, self._last_id
+            if rebuild:
+                self._pending = []
+        if rebuild:
+            self._start_rebuild(generation)
+            return self._filter
+        try:
+            self._catch_up(generation, last_id)
+        finally:
+            self._finish_refresh()
+        return self._filter
+
+    def add(self, username):
+        """Record a username saved by this process; no-op until built."""
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(username, counted=False)
+            if self._pending is not None:
+                self._pending.append(username)
+
+    def is_taken(self, username):
+        bloom = self._ready_filter()
+        if bloom is not None and username not in bloom:
+            return False
+        return User.objects.filter(username=username).exists()
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+            self._last_id = 0
+            self._refreshed_at = 0.0
+            self._built_at = None
+            self._pending = None
+            self._generation += 1
+
+
+username_index = UsernameIndex()
+
+
+def is_username_available(username):
+    return not username_index.is_taken(username)
@@ -0,0 +1,128 @@
+# user/backends.py
+"""
+Authentication backend that caches the per-request user lookup.
+
+``CachedModelBackend.get_user`` keeps a compact copy of the ``User`` row in
+the cache framework, so rebuilding ``request.user`` does not hit the database
+on every authenticated request. The copy holds the identity and permission
+flags plus the session auth hash, never the password hash itself; the
+rebuilt user answers ``get_session_auth_hash()`` from it until its password
+is loaded or changed. Any other field is deferred and loads on first access.
+Entries are dropped by the ``User`` post_save/post_delete receivers.
+
+Settings:
+    USER_AUTH_CACHE_ENABLED  toggle (default True)
+    USER_AUTH_CACHE_TIMEOUT  seconds (default 300)
+    USER_AUTH_CACHE_ALIAS    cache alias (default "default")
+"""
+
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import User
+
+CACHED_FIELDS = (
+    "id",
+    "username",
+    "first_name",
+    "last_name",
+    "email",
+    "user_type",
+    "is_admin",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    "is_new_user",
+)
+# Saves touching any of these drop the cached copy.
+INVALIDATING_FIELDS = CACHED_FIELDS + ("password",)
+_KEY_PREFIX = "user:auth"
+# Bump when the cached layout changes so stale entries are ignored.
+_LAYOUT_VERSION = 2
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def auth_cache_enabled():
+    return getattr(settings, "USER_AUTH_CACHE_ENABLED", True)
+
+
+def _cache():
+    return caches[getattr(settings, "USER_AUTH_CACHE_ALIAS", "default")]
+
+
+def _key(user_id):
+    return f"{_KEY_PREFIX}:{_LAYOUT_VERSION}:{user_id}"
+
+
+@lru_cache(maxsize=None)
+def _field_order():
+    # Model.from_db() expects partial rows in concrete field order.
+    return tuple(
+        field.attname
+        for field in User._meta.concrete_fields
+        if field.attname in CACHED_FIELDS
+    )
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_auth_cache_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_auth_cache_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
+
+
+def invalidate_cached_user(user_id):
+    _cache().delete(_key(user_id))
+
+
+def _rebuild(values, session_hash):
+    user = User.from_db(DEFAULT_DB_ALIAS, _field_order(), values)
+
+    def get_session_auth_hash():
+        # The password is deferred; once loaded or set, hash it as usual.
+        if "password" in user.__dict__:
+            return User.get_session_auth_hash(user)
+        return session_hash
+
+    user.get_session_auth_hash = get_session_auth_hash
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        if not auth_cache_enabled():
+            return super().get_user(user_id)
+
+        entry = _cache().get(_key(user_id))
+        if entry is not None:
+            _count("hits")
+            user = _rebuild(*entry)
+            return user if self.user_can_authenticate(user) else None
+
+        _count("misses")
+        user = super().get_user(user_id)
+        if user is not None:
+            _cache().set(
+                _key(user.pk),
+                (
+                    tuple(getattr(user, name) for name in _field_order()),
+                    user.get_session_auth_hash(),
+                ),
+                getattr(settings, "USER_AUTH_CACHE_TIMEOUT", 300),
+            )
+        return user
@@ -0,0 +1,154 @@
+# user/counters.py
+"""
+Materialized profile counts per organization and role.
+
+``OrganizationRoleCount`` holds one row per (organization, role) with active
+and inactive totals. A user counts towards a role when they have that role's
+``PROFILE_MODEL_MAP`` profile and their ``user_type`` is that role. The
+receivers in ``user.signals`` apply +1/-1 deltas inside the writing
+transaction, so the counts roll back with it. Moving a user whose profile
+is not loaded costs one extra UPDATE per affected role on ``user_type`` and
+``is_active`` changes; other saves cost nothing. ``rebuild_organization_counts``
+(``manage.py rebuild_organization_counts``) repairs drift from bulk writes
+and queryset ``update()`` calls.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Subquery
+
+from .models import PROFILE_MODEL_MAP, OrganizationRoleCount, User, _get_profile_model
+
+
+def _column(active):
+    return "active" if active else "inactive"
+
+
+def adjust_organization_count(organization_id, user_type, active, delta):
+    """Add ``delta`` to one bucket, creating its row on the first increment."""
+    if not delta or organization_id is None:
+        return
+    column = _column(active)
+    rows = OrganizationRoleCount.objects.filter(
+        organization_id=organization_id, user_type=user_type
+    )
+    if rows.update(**{column: F(column) + delta}) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            OrganizationRoleCount.objects.create(
+                organization_id=organization_id, user_type=user_type, **{column: delta}
+            )
+    except IntegrityError:
+        # A concurrent writer created the row first.
+        rows.update(**{column: F(column) + delta})
+
+
+def move_user_counts(user_id, previous, current, organizations=None):
+    """
+    Move a user between ``(user_type, is_active)`` buckets of the organization
+    their role profile belongs to; one UPDATE per affected role.
+    ``organizations`` maps roles whose profile is already known to its
+    organization id (None without a profile), skipping the profile lookup.
+    """
+    (old_role, old_active), (new_role, new_active) = previous, current
+    if old_role == new_role:
+        if old_active == new_active:
+            return
+        steps = [(new_role, {_column(old_active): -1, _column(new_active): 1})]
+    else:
+        steps = [(old_role, {_column(old_active): -1}), (new_role, {_column(new_active): 1})]
+
+    organizations = organizations or {}
+    for role, deltas in steps:
+        model = _get_profile_model(role)
+        if model is None:
+            continue
+        if role in organizations:
+            for column, delta in deltas.items():
+                adjust_organization_count(organizations[role], role, column == "active", delta)
+            continue
+        organization = model.objects.filter(user_id=user_id).values("organization_id")[:1]
+        updated = OrganizationRoleCount.objects.filter(
+            user_type=role, organization_id=Subquery(organization)
+        ).update(**{column: F(column) + delta for column, delta in deltas.items()})
+        if not updated and role != old_role:
+            # First profile of this role in the organization.
+            organization_id = (
+                model.objects.filter(user_id=user_id).values_list("organization_id", flat=True).first()
+            )
+            adjust_organization_count(organization_id, role, new_active, 1)
+
+
+def rebuild_organization_counts(organization_ids=None):
+    """Recount from the profile tables; all organizations when ids are None."""
+    buckets = {}
+    for role in PROFILE_MODEL_MAP:
+        model = _get_profile_model(role)
+        if model is None:
+            continue
+        profiles = model.objects.filter(user__user_type=role)
+        if organization_ids is not None:
+            profiles = profiles.filter(organization_id__in=organization_ids)
+        rows = (
+            profiles.order_by()
+            .values("organization_id", "user__is_active")
+            .annotate(total=Count("pk"))
+        )
+        for row in rows:
+            counts = buckets.setdefault((row["organization_id"], role), {})
+            column = _column(row["user__is_active"])
+            counts[column] = counts.get(column, 0) + row["total"]
+
+    with transaction.atomic():
+        stale = OrganizationRoleCount.objects.all()
+        if organization_ids is not None:
+            stale = stale.filter(organization_id__in=organization_ids)
+        stale.delete()
+        OrganizationRoleCount.objects.bulk_create(
+            [
+                OrganizationRoleCount(organization_id=organization_id, user_type=role, **counts)
+                for (organization_id, role), counts in buckets.items()
+            ],
+            batch_size=1000,
+        )
+    return len(buckets)
+
+
+def get_organization_counts(organization_id):
+    """
+    ``{"total", "active", "inactive", "by_role": {role: {"label", "active",
+    "inactive", "total"}}}`` for one organization, read from at most one row
+    per role.
+    """
+    labels = dict(User.UserType.choices)
+    counts = {"total": 0, "active": 0, "inactive": 0, "by_role": {}}
+    rows = OrganizationRoleCount.objects.filter(organization_id=organization_id).values_list(
+        "user_type", "active", "inactive"
+    )
+    for role, active, inactive in rows:
+        active, inactive = max(active, 0), max(inactive, 0)
+        counts["by_role"][role] = {
+            "label": labels.get(role, role),
+            "active": active,
+            "inactive": inactive,
+            "total": active + inactive,
+        }
+        counts["active"] += active
+        counts["inactive"] += inactive
+    counts["total"] = counts["active"] + counts["inactive"]
+    return counts
+
+
+def get_organization_role_count(organization_id, user_type, active=None):
+    """One role's count; ``active`` True/False narrows it to that status."""
+    row = (
+        OrganizationRoleCount.objects.filter(organization_id=organization_id, user_type=user_type)
+        .values_list("active", "inactive")
+        .first()
+    )
+    if row is None:
+        return 0
+    active_count, inactive_count = max(row[0], 0), max(row[1], 0)
+    if active is None:
+        return active_count + inactive_count
+    return active_count if active else inactive_count
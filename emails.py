@@ -0,0 +1,104 @@
+# user/emails.py
+"""
+Builders for account email messages.
+
+The activation template is loaded and compiled once per process and rendered
+for many users against a single reused ``Context``. The activation URL comes
+from ``routes.reverse_format``, so building a batch of messages does no
+per-user template lookup or ``reverse()`` call.
+"""
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMessage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template.context import make_context
+from django.template.loader import get_template
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .routes import reverse_format
+
+ACTIVATION_SUBJECT = "Activate Your Account"
+ACTIVATION_TEMPLATE = "email/activation_email.html"
+
+
+def get_activation_base_url():
+    base_url = getattr(settings, "SITE_BASE_URL", "")
+    if not base_url and settings.ALLOWED_HOSTS:
+        base_url = f"https://{settings.ALLOWED_HOSTS[0]}"
+    if not base_url:
+        base_url = "http://localhost:8000"
+    return base_url.rstrip("/")
+
+
+def needs_activation_email(user):
+    return not user.is_active and bool(user.email)
+
+
+@lru_cache(maxsize=None)
+def get_activation_template():
+    """Compiled ``django.template.base.Template`` for the activation email."""
+    template = get_template(ACTIVATION_TEMPLATE)
+    return getattr(template, "template", template)
+
+
+@receiver(setting_changed)
+def _clear_template_cache(setting, **kwargs):
+    if setting == "TEMPLATES":
+        get_activation_template.cache_clear()
+
+
+def activation_url(user, base_url=None, path_format=None):
+    if base_url is None:
+        base_url = get_activation_base_url()
+    if path_format is None:
+        path_format = reverse_format("activate", "uidb64", "token")
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    token = default_token_generator.make_token(user)
+    return base_url + path_format.format(uidb64=uid, token=token)
+
+
+def render_activation_bodies(users, base_url=None):
+    """Render the activation email body for each of ``users``, in order."""
+    if base_url is None:
+        base_url = get_activation_base_url()
+    path_format = reverse_format("activate", "uidb64", "token")
+    template = get_activation_template()
+    context = make_context({}, autoescape=template.engine.autoescape)
+
+    bodies = []
+    for user in users:
+        with context.push(user=user, activation_url=activation_url(user, base_url, path_format)):
+            bodies.append(template.render(context))
+    return bodies
+
+
+def build_activation_messages(users, base_url=None, headers=None):
+    """
+    Return one activation ``EmailMessage`` per user without sending them.
+    ``headers`` is an optional list of per-message header dicts.
+    """
+    users = list(users)
+    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", None)
+    headers = headers or [None] * len(users)
+    return [
+        EmailMessage(
+            subject=ACTIVATION_SUBJECT,
+            body=body,
+            from_email=from_email,
+            to=[user.email],
+            headers=message_headers,
+        )
+        for user, body, message_headers in zip(
+            users, render_activation_bodies(users, base_url), headers
+        )
+    ]
+
+
+def build_activation_message(user, base_url=None, headers=None):
+    """Return the activation ``EmailMessage`` for ``user`` without sending it."""
+    return build_activation_messages([user], base_url, [headers])[0]
@@ -0,0 +1,157 @@
+# user/export.py
+"""
+Streaming CSV/JSON export of users joined with their role profile.
+
+Rows come from one ``values_list()`` query read with ``.iterator()`` and are
+encoded as they are produced, so memory stays flat however many users match.
+"""
+
+import csv
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+
+from .models import PROFILE_MODEL_MAP, User, _get_profile_model, get_profile_accessor
+
+EXPORT_CHUNK_SIZE = 2000
+
+USER_COLUMNS = (
+    "id",
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "user_type",
+    "is_active",
+    "is_staff",
+    "is_admin",
+    "date_joined",
+)
+PROFILE_COLUMNS = ("profile_slug", "organization_id")
+# Spreadsheet apps evaluate cells starting with these as formulas.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Same filters as UserAdmin.list_filter; the admin's ``__exact`` spelling works too.
+FILTER_FIELDS = ("user_type", "is_admin", "is_staff", "is_active")
+_TRUE = {"1", "true", "yes", "on"}
+_FALSE = {"0", "false", "no", "off"}
+
+
+class ExportFilterError(ValueError):
+    """Messages name the parameter only; they are shown back to the client."""
+
+
+def filter_users(params, queryset=None):
+    """Apply ``UserAdmin.list_filter`` style query parameters to ``queryset``."""
+    queryset = User.objects.all() if queryset is None else queryset
+    filters = {}
+    for name in FILTER_FIELDS:
+        value = params.get(name, params.get(f"{name}__exact"))
+        if value in (None, ""):
+            continue
+        if name == "user_type":
+            if value not in User.UserType.values:
+                raise ExportFilterError("Unknown user_type.")
+            filters[name] = value
+        elif value.lower() in _TRUE:
+            filters[name] = True
+        elif value.lower() in _FALSE:
+            filters[name] = False
+        else:
+            raise ExportFilterError(f"{name} must be a boolean.")
+    return queryset.filter(**filters)
+
+
+def _organization_field():
+    """
+    Organization field exported as an extra ``organization`` column, named by
+    ``USER_EXPORT_ORGANIZATION_FIELD``; None (the default) leaves it out.
+    """
+    name = getattr(settings, "USER_EXPORT_ORGANIZATION_FIELD", None)
+    if name is None:
+        return None
+    model = _get_profile_model(next(iter(PROFILE_MODEL_MAP)))
+    organization = model._meta.get_field("organization").related_model
+    try:
+        organization._meta.get_field(name)
+    except FieldDoesNotExist:
+        raise ImproperlyConfigured(
+            f"USER_EXPORT_ORGANIZATION_FIELD names {organization.__name__}.{name}, "
+            "which does not exist."
+        ) from None
+    return name
+
+
+def profile_columns():
+    return PROFILE_COLUMNS + (("organization",) if _organization_field() else ())
+
+
+def _profile_lookups():
+    organization_field = _organization_field()
+    lookups = []
+    for user_type in PROFILE_MODEL_MAP:
+        accessor = get_profile_accessor(user_type)
+        if accessor:
+            fields = [f"{accessor}__slug", f"{accessor}__organization_id"]
+            if organization_field:
+                fields.append(f"{accessor}__organization__{organization_field}")
+            lookups.append((user_type, tuple(fields)))
+    return lookups
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield one tuple of ``USER_COLUMNS + profile_columns()`` per user.
+    Profile columns come from the profile matching the user's ``user_type``.
+    """
+    profile_lookups = _profile_lookups()
+    profile_width = len(profile_columns())
+    columns = list(USER_COLUMNS)
+    offsets = {}
+    for user_type, lookups in profile_lookups:
+        offsets[user_type] = len(columns)
+        columns.extend(lookups)
+
+    width = len(USER_COLUMNS)
+    type_index = USER_COLUMNS.index("user_type")
+    joined_index = USER_COLUMNS.index("date_joined")
+    empty = (None,) * profile_width
+    rows = queryset.order_by("pk").values_list(*columns).iterator(chunk_size=chunk_size)
+    for row in rows:
+        user = list(row[:width])
+        if user[joined_index] is not None:
+            user[joined_index] = user[joined_index].isoformat()
+        offset = offsets.get(user[type_index])
+        profile = empty if offset is None else row[offset:offset + profile_width]
+        yield tuple(user) + tuple(profile)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Usernames and names are user input; keep them text, not formulas.
+        return "'" + value
+    return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(USER_COLUMNS + profile_columns())
+    for row in rows:
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def stream_json(rows):
+    keys = USER_COLUMNS + profile_columns()
+    separator = "[\n"
+    for row in rows:
+        yield separator + json.dumps(dict(zip(keys, row)))
+        separator = ",\n"
+    yield "[]" if separator == "[\n" else "\n]"
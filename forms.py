@@ -3,6 +3,9 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
 
 from user.models import User
 
@@ -24,8 +27,13 @@ class ProfileUserFieldsMixin(forms.ModelForm):
             self.fields["user_first_name"].initial = user.first_name
             self.fields["user_last_name"].initial = user.last_name
 
+    # BaseProfileUserFormSet turns this off and checks every row in one query.
+    check_user_conflicts = True
+
     def clean_user_username(self):
         username = self.cleaned_data["user_username"]
+        if not self.check_user_conflicts:
+            return username
         existing = User.objects.filter(username=username)
         # Allow keeping the same username on update
         if self.instance and getattr(self.instance, "user_id", None):
@@ -48,6 +56,8 @@ class ProfileUserFieldsMixin(forms.ModelForm):
                 first_name=self.cleaned_data["user_first_name"],
                 last_name=self.cleaned_data["user_last_name"],
             )
+            # This form saves the profile; ensure_profile must not create one.
+            user.manages_own_profile = True
             profile.user = user
         elif not user:
             # Shouldn't happen, but guard anyway
@@ -59,8 +69,9 @@ class ProfileUserFieldsMixin(forms.ModelForm):
         user.first_name = self.cleaned_data["user_first_name"]
         user.last_name = self.cleaned_data["user_last_name"]
         if commit:
-            user.save()
-            profile.save()
+            with transaction.atomic():
+                user.save()
+                profile.save()
         return profile
 
     def _infer_user_type(self, profile):
@@ -75,6 +86,93 @@ class ProfileUserFieldsMixin(forms.ModelForm):
         return User.UserType.OTHER
 
 
+def find_user_conflicts(entries):
+    """
+    Check many (username, email) pairs at once.
+
+    ``entries`` is a sequence of ``(username, email, user_id)`` tuples, where
+    ``user_id`` is the row's existing user (or None) and is ignored when
+    matching. Returns ``{index: [(field, message), ...]}`` covering both rows
+    that clash with existing users and duplicates inside ``entries``, using a
+    single ``IN`` query.
+    """
+    conflicts = {}
+
+    def _add(index, field, message):
+        conflicts.setdefault(index, []).append((field, message))
+
+    by_username = {}
+    by_email = {}
+    seen_emails = set()
+    for index, (username, email, _user_id) in enumerate(entries):
+        if username:
+            if username in by_username:
+                _add(index, "username", "Username is repeated in this submission.")
+            by_username.setdefault(username, []).append(index)
+        if email:
+            # Emails are compared case-insensitively, here and in the query.
+            email = email.lower()
+            if email in seen_emails:
+                _add(index, "email", "Email is repeated in this submission.")
+            seen_emails.add(email)
+            by_email.setdefault(email, []).append(index)
+
+    if not by_username and not by_email:
+        return conflicts
+
+    existing = (
+        User.objects.annotate(email_lower=Lower("email"))
+        .filter(Q(username__in=list(by_username)) | Q(email_lower__in=list(by_email)))
+        .values_list("pk", "username", "email_lower")
+    )
+    for pk, username, email in existing:
+        for index in by_username.get(username, ()):
+            if entries[index][2] != pk:
+                _add(index, "username", "Username is already taken.")
+        for index in by_email.get(email, ()):
+            if entries[index][2] != pk:
+                _add(index, "email", "Email is already in use.")
+    return conflicts
+
+
+class BaseProfileUserFormSet(forms.BaseModelFormSet):
+    """
+    Model formset for ``ProfileUserFieldsMixin`` forms that validates every
+    row's username and email together instead of one query per form.
+    """
+
+    field_map = {"username": "user_username", "email": "user_email"}
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        form.check_user_conflicts = False
+        return form
+
+    def clean(self):
+        super().clean()
+        forms_to_check = [
+            form
+            for form in self.forms
+            if form.has_changed()
+            and not self._should_delete_form(form)
+            and hasattr(form, "cleaned_data")
+        ]
+        entries = [
+            (
+                form.cleaned_data.get("user_username"),
+                form.cleaned_data.get("user_email"),
+                getattr(form.instance, "user_id", None),
+            )
+            for form in forms_to_check
+        ]
+        for index, problems in find_user_conflicts(entries).items():
+            form = forms_to_check[index]
+            for field, message in problems:
+                name = self.field_map[field]
+                if name in form.cleaned_data:
+                    form.add_error(name, message)
+
+
 class RegistrationForm(UserCreationForm):
     """A custom user registration form for creating new user accounts.
 
@@ -82,6 +180,7 @@ class RegistrationForm(UserCreationForm):
 
     Attributes:
         email: An email field with custom widget attributes.
+        user_type: The self-service role, which selects the profile form.
 
     Methods:
         save: Overrides the default save method to set the user as inactive initially.
@@ -93,6 +192,14 @@ class RegistrationForm(UserCreationForm):
             attrs={"class": "form-control", "placeholder": "Email"}
         ),
     )
+    user_type = forms.ChoiceField(
+        choices=[
+            ("Attendee", "Attendee"),
+            ("Leader", "Leader"),
+            ("Faculty", "Faculty"),
+        ],
+        initial="Attendee",
+    )
 
     class Meta:
         model = User
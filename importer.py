@@ -0,0 +1,217 @@
+# user/importer.py
+"""
+Streaming bulk import of users and their role profiles.
+
+Rows are consumed in chunks. Each chunk inserts its users with one
+``bulk_create``, inserts the matching ``PROFILE_MODEL_MAP`` profiles with
+precomputed unique slugs, and queues activation mail for the whole chunk as
+``EmailOutbox`` rows in the same transaction. ``bulk_create`` does not send
+``post_save``, so ``ensure_profile`` and ``send_activation_email`` are
+bypassed on purpose.
+"""
+
+import csv
+import time
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from core.logging import log_event
+
+from .counters import adjust_organization_count
+from .models import User, UserSearchToken, _get_profile_model
+from .outbox import enqueue_activation_emails
+from .search import build_search_tokens
+from .slugs import allocate_slugs
+from .stats import adjust_user_counts
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class RowError(ValueError):
+    """Raised for a roster row that cannot be imported."""
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.profiles = 0
+        self.emails = 0
+        self.skipped = []
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        if not self.elapsed:
+            return 0.0
+        return self.rows / self.elapsed
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "profiles": self.profiles,
+            "emails": self.emails,
+            "skipped": len(self.skipped),
+            "elapsed": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+def read_csv_rows(fileobj):
+    """Yield roster rows from a CSV file object with a header line."""
+    for row in csv.DictReader(fileobj):
+        yield {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _build_user(row, active):
+    username = row.get("username", "")
+    if not username:
+        raise RowError("missing username")
+
+    user_type = (row.get("user_type") or User.UserType.ATTENDEE).upper()
+    if user_type not in User.UserType.values:
+        raise RowError(f"unknown user_type {user_type!r}")
+
+    return User(
+        username=username,
+        email=row.get("email", ""),
+        first_name=row.get("first_name", ""),
+        last_name=row.get("last_name", ""),
+        user_type=user_type,
+        is_active=active,
+        # make_password(None) yields an unusable password without hashing cost.
+        password=make_password(row.get("password") or None),
+    )
+
+
+def _row_organization_id(row, default):
+    value = row.get("organization_id") or row.get("organization")
+    if value:
+        return int(value)
+    if default is None:
+        return None
+    return getattr(default, "pk", default)
+
+
+def _import_chunk(rows, result, organization, active, send_email):
+    users = []
+    organizations = []
+    seen = set()
+    usernames = [row.get("username", "") for row in rows]
+    existing = set(
+        User.objects.filter(username__in=usernames).values_list("username", flat=True)
+    )
+
+    for row in rows:
+        try:
+            user = _build_user(row, active)
+            if user.username in existing or user.username in seen:
+                raise RowError(f"username {user.username!r} already exists")
+            organization_id = _row_organization_id(row, organization)
+            if organization_id is None and _get_profile_model(user.user_type):
+                raise RowError("missing organization for profile")
+        except ValueError as exc:
+            result.skipped.append((row.get("username", ""), str(exc)))
+            continue
+        seen.add(user.username)
+        users.append(user)
+        organizations.append(organization_id)
+
+    if not users:
+        return
+
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        if any(user.pk is None for user in users):
+            # Backends that cannot return ids from bulk inserts.
+            pks = dict(
+                User.objects.filter(username__in=[u.username for u in users]).values_list(
+                    "username", "pk"
+                )
+            )
+            for user in users:
+                user.pk = pks[user.username]
+
+        profiles_by_model = {}
+        for user, organization_id in zip(users, organizations):
+            model = _get_profile_model(user.user_type)
+            if model is None:
+                continue
+            profile = model(user=user, organization_id=organization_id)
+            profiles_by_model.setdefault(model, []).append(profile)
+
+        slugs = {}
+        for model, profiles in profiles_by_model.items():
+            bases = [profile.generate_slug() for profile in profiles]
+            for profile, slug in zip(profiles, allocate_slugs(model, bases)):
+                profile.slug = slug
+                slugs[profile.user.pk] = slug
+            model.objects.bulk_create(profiles)
+            result.profiles += len(profiles)
+
+        # bulk_create skips the save receivers that keep search tokens current.
+        UserSearchToken.objects.bulk_create(
+            [
+                token
+                for user in users
+                for token in build_search_tokens(user, slugs.get(user.pk))
+            ],
+            batch_size=1000,
+        )
+
+        deltas = Counter((user.user_type, user.is_active) for user in users)
+        transaction.on_commit(lambda: adjust_user_counts(deltas))
+        organization_deltas = Counter(
+            (profile.organization_id, profile.user.user_type, profile.user.is_active)
+            for profiles in profiles_by_model.values()
+            for profile in profiles
+        )
+        for (organization_id, user_type, active), delta in organization_deltas.items():
+            adjust_organization_count(organization_id, user_type, active, delta)
+
+        if send_email:
+            result.emails += enqueue_activation_emails(users)
+
+    result.created += len(users)
+
+
+def import_users(
+    rows,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    organization=None,
+    active=False,
+    send_email=True,
+    progress=None,
+):
+    """
+    Import an iterable of roster rows (dicts with ``username``, ``email``,
+    ``first_name``, ``last_name``, ``user_type`` and optionally ``password``
+    and ``organization_id``). ``organization`` is used for rows without one.
+
+    ``progress`` is called with the running ``ImportResult`` after each chunk.
+    """
+    result = ImportResult()
+    started = time.perf_counter()
+    for chunk in _chunks(rows, chunk_size):
+        result.rows += len(chunk)
+        _import_chunk(chunk, result, organization, active, send_email)
+        result.elapsed = time.perf_counter() - started
+        if progress:
+            progress(result)
+
+    result.elapsed = time.perf_counter() - started
+    log_event("user.import.completed", extra=result.as_dict())
+    return result
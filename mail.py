@@ -0,0 +1,183 @@
+# user/mail.py
+"""
+Pooled delivery of outgoing account mail.
+
+``MailWorker`` owns a bounded queue and one background thread that drains it
+in batches over a single reused mail connection (``get_connection()`` +
+``send_messages``), instead of one connection and TLS handshake per message.
+A full queue blocks submitters for up to ``submit_timeout`` seconds and then
+rejects the message, so bursts apply backpressure instead of spawning
+unbounded jobs.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+from core.logging import log_event
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MailWorker:
+    def __init__(
+        self,
+        maxsize=1000,
+        batch_size=100,
+        submit_timeout=5.0,
+        idle_timeout=30.0,
+        backend=None,
+    ):
+        self.batch_size = batch_size
+        self.submit_timeout = submit_timeout
+        self.idle_timeout = idle_timeout
+        self.backend = backend
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._connection = None
+        self.sent = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queue_depth": self._queue.qsize(),
+        }
+
+    def _ensure_started(self):
+        with self._lock:
+            # Threads do not survive a fork, so check liveness, not existence.
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="user-mail-worker", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, message, on_sent=None):
+        """
+        Queue ``message`` for delivery; ``on_sent`` is called after it was
+        handed to the backend. Returns False when the queue stayed full.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put((message, on_sent), timeout=self.submit_timeout)
+        except queue.Full:
+            self.rejected += 1
+            log_event("email.worker.rejected", extra=self.stats())
+            return False
+        return True
+
+    def flush(self):
+        """Block until every queued message has been attempted."""
+        self._queue.join()
+
+    def close(self, timeout=10.0):
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _open(self):
+        if self._connection is None:
+            self._connection = get_connection(self.backend, fail_silently=False)
+            self._connection.open()
+        return self._connection
+
+    def _close_connection(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                logger.exception("Closing the mail connection failed")
+            self._connection = None
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._close_connection()
+                continue
+
+            batch = []
+            stopping = item is _STOP
+            if not stopping:
+                batch.append(item)
+            while len(batch) < self.batch_size and not stopping:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            try:
+                if batch:
+                    self._deliver(batch)
+            finally:
+                for _ in range(len(batch) + int(stopping)):
+                    self._queue.task_done()
+
+            if stopping:
+                self._close_connection()
+                return
+
+    def _send_one(self, message):
+        for attempt in range(2):
+            try:
+                return bool(self._open().send_messages([message]))
+            except Exception:
+                # A pooled connection may have been dropped by the server;
+                # reconnect once before giving up on the message.
+                self._close_connection()
+                if attempt:
+                    logger.exception("Sending queued message to %s failed", message.to)
+        return False
+
+    def _deliver(self, batch):
+        # Messages go out one by one over the shared connection so a failure
+        # part-way through a batch never causes already-sent mail to be resent.
+        for message, on_sent in batch:
+            if not self._send_one(message):
+                self.failed += 1
+                continue
+            self.sent += 1
+            if on_sent is not None:
+                try:
+                    on_sent()
+                except Exception:
+                    logger.exception("Mail on_sent callback failed")
+        log_event("email.worker.batch", extra={"batch": len(batch), **self.stats()})
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_mail_worker():
+    """Process-wide ``MailWorker`` configured from ``USER_MAIL_*`` settings."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = MailWorker(
+                maxsize=getattr(settings, "USER_MAIL_QUEUE_SIZE", 1000),
+                batch_size=getattr(settings, "USER_MAIL_BATCH_SIZE", 100),
+                submit_timeout=getattr(settings, "USER_MAIL_SUBMIT_TIMEOUT", 5.0),
+            )
+            atexit.register(_worker.close)
+        return _worker
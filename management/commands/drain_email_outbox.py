@@ -0,0 +1,66 @@
+# user/management/commands/drain_email_outbox.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user.mail import get_mail_worker
+from user.outbox import DEFAULT_BATCH_SIZE, MAX_ATTEMPTS, drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Send pending account mail from the email outbox in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for new rows instead of exiting when the outbox is empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to sleep between polls in --loop mode.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        worker = get_mail_worker()
+        totals = {"claimed": 0, "sent": 0, "cancelled": 0, "retrying": 0, "failed": 0}
+        started = time.perf_counter()
+        try:
+            while True:
+                result = drain_outbox(
+                    batch_size=options["batch_size"],
+                    worker=worker,
+                    max_attempts=options["max_attempts"],
+                )
+                for key, value in result.items():
+                    totals[key] += value
+                if result["claimed"]:
+                    self.stdout.write(
+                        ", ".join(f"{value} {key}" for key, value in result.items())
+                    )
+                    continue
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
+
+        elapsed = time.perf_counter() - started
+        rate = totals["sent"] / elapsed if elapsed else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {totals['sent']} of {totals['claimed']} claimed messages "
+                f"in {elapsed:.2f}s ({rate:.1f} msg/s); {totals['retrying']} retrying, "
+                f"{totals['failed']} failed, {totals['cancelled']} cancelled."
+            )
+        )
@@ -0,0 +1,65 @@
+# user/management/commands/import_users.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user.importer import DEFAULT_CHUNK_SIZE, import_users, read_csv_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import users and their role profiles from a CSV roster."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with a header row.")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument(
+            "--organization",
+            type=int,
+            help="Organization id for rows without an organization_id column.",
+        )
+        parser.add_argument(
+            "--active",
+            action="store_true",
+            help="Create accounts as active (no activation email is sent).",
+        )
+        parser.add_argument(
+            "--no-email",
+            action="store_true",
+            help="Do not queue activation emails.",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        def _progress(result):
+            self.stdout.write(
+                f"{result.rows} rows, {result.created} created, "
+                f"{len(result.skipped)} skipped ({result.rows_per_second:.1f} rows/s)"
+            )
+
+        try:
+            handle = open(options["path"], newline="", encoding="utf-8-sig")
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        with handle:
+            result = import_users(
+                read_csv_rows(handle),
+                chunk_size=options["chunk_size"],
+                organization=options["organization"],
+                active=options["active"],
+                send_email=not options["no_email"],
+                progress=_progress,
+            )
+
+        for username, reason in result.skipped:
+            self.stderr.write(f"skipped {username or '<blank>'}: {reason}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.created} users and {result.profiles} profiles "
+                f"from {result.rows} rows in {result.elapsed:.2f}s "
+                f"({result.rows_per_second:.1f} rows/s); "
+                f"{result.emails} activation emails queued."
+            )
+        )
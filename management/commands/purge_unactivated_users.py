@@ -0,0 +1,93 @@
+# user/management/commands/purge_unactivated_users.py
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.logging import log_event
+
+from user.models import PROFILE_MODEL_MAP, User, _get_profile_model
+
+
+class Command(BaseCommand):
+    help = "Delete registrations that were never activated, in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Only purge accounts that joined more than this many days ago.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.5,
+            help="Seconds to pause between batches to limit load on the database.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Count the matching accounts without deleting anything.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1.")
+
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        candidates = User.objects.unactivated(joined_before=cutoff).order_by("date_joined", "pk")
+        profile_labels = {
+            _get_profile_model(user_type)._meta.label
+            for user_type in PROFILE_MODEL_MAP
+            if _get_profile_model(user_type)
+        }
+
+        users = profiles = batches = 0
+        last = None
+        started = time.perf_counter()
+        while True:
+            page = candidates
+            if last is not None:
+                joined, pk = last
+                page = page.filter(Q(date_joined__gt=joined) | Q(date_joined=joined, pk__gt=pk))
+            rows = list(page.values_list("pk", "date_joined")[:batch_size])
+            if not rows:
+                break
+            last_pk, last_joined = rows[-1]
+            last = (last_joined, last_pk)
+            batches += 1
+
+            if options["dry_run"]:
+                users += len(rows)
+                continue
+
+            with transaction.atomic():
+                # Re-check the conditions so an account activated meanwhile survives.
+                _total, deleted = User.objects.unactivated(joined_before=cutoff).filter(
+                    pk__in=[pk for pk, _joined in rows]
+                ).delete()
+            users += deleted.get(User._meta.label, 0)
+            profiles += sum(deleted.get(label, 0) for label in profile_labels)
+            log_event("user.purge.batch", extra={"batch": batches, "users": users})
+
+            if options["sleep"] and len(rows) == batch_size:
+                time.sleep(options["sleep"])
+
+        elapsed = time.perf_counter() - started
+        rate = users / elapsed if elapsed else 0.0
+        verb = "would be deleted" if options["dry_run"] else "deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{users} unactivated users {verb} ({profiles} profiles) in {batches} batches, "
+                f"{elapsed:.1f}s, {rate:.0f} users/s."
+            )
+        )
@@ -0,0 +1,28 @@
+# user/management/commands/rebuild_organization_counts.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from user.counters import rebuild_organization_counts
+
+
+class Command(BaseCommand):
+    help = "Recount profiles per organization and role from the profile tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--organization",
+            type=int,
+            action="append",
+            dest="organizations",
+            help="Only rebuild this organization id (repeatable). Default: all.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        buckets = rebuild_organization_counts(options["organizations"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {buckets} organization/role counters in {elapsed:.2f}s.")
+        )
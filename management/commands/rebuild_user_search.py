@@ -0,0 +1,45 @@
+# user/management/commands/rebuild_user_search.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from user.models import User
+from user.search import rebuild_search_tokens
+
+
+class Command(BaseCommand):
+    help = "Rebuild the user search tokens, including profile slugs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        users = tokens = 0
+        last_pk = 0
+        started = time.perf_counter()
+        while True:
+            pks = list(
+                User.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            with transaction.atomic():
+                tokens += rebuild_search_tokens(pks)
+            users += len(pks)
+            last_pk = pks[-1]
+
+        elapsed = time.perf_counter() - started
+        rate = users / elapsed if elapsed else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {users} users ({tokens} tokens) in {elapsed:.1f}s, {rate:.0f} users/s."
+            )
+        )
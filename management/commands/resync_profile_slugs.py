@@ -0,0 +1,95 @@
+# user/management/commands/resync_profile_slugs.py
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from user.models import PROFILE_MODEL_MAP, _get_profile_model
+from user.slugs import resync_profile_slugs
+
+
+def _resync_role(user_type, chunk_size, dry_run):
+    started = time.perf_counter()
+    totals = resync_profile_slugs(
+        _get_profile_model(user_type), chunk_size=chunk_size, dry_run=dry_run
+    )
+    totals["seconds"] = time.perf_counter() - started
+    return user_type, totals
+
+
+class Command(BaseCommand):
+    help = "Bring every role profile slug back in line with generate_slug()."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--role",
+            action="append",
+            dest="roles",
+            choices=[str(user_type) for user_type in PROFILE_MODEL_MAP],
+            help="Only resync this role's profile table (repeatable). Default: all.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Resync profile tables in this many parallel processes.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the profiles whose slug would change.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive.")
+        roles = [
+            user_type
+            for user_type in PROFILE_MODEL_MAP
+            if not options["roles"] or user_type in options["roles"]
+        ]
+        roles = [user_type for user_type in roles if _get_profile_model(user_type)]
+        dry_run = options["dry_run"]
+        workers = min(max(options["workers"], 1), len(roles) or 1)
+
+        started = time.perf_counter()
+        if workers > 1:
+            # Forked workers must not share the parent's database sockets; the
+            # single-process path keeps its connection (and any open transaction).
+            connections.close_all()
+            context = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=context, initializer=connections.close_all
+            ) as pool:
+                futures = [
+                    pool.submit(_resync_role, user_type, chunk_size, dry_run)
+                    for user_type in roles
+                ]
+                results = [future.result() for future in futures]
+        else:
+            results = [_resync_role(user_type, chunk_size, dry_run) for user_type in roles]
+        elapsed = time.perf_counter() - started
+
+        verb = "would change" if dry_run else "changed"
+        scanned = changed = 0
+        for user_type, totals in results:
+            rate = totals["scanned"] / totals["seconds"] if totals["seconds"] else 0.0
+            self.stdout.write(
+                f"  {user_type:<10} {totals['scanned']:>9} scanned  "
+                f"{totals['changed']:>8} {verb}  {totals['seconds']:8.2f}s  {rate:10.0f} rows/s"
+            )
+            scanned += totals["scanned"]
+            changed += totals["changed"]
+
+        rate = scanned / elapsed if elapsed else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{scanned} profiles scanned, {changed} {verb}, "
+                f"{elapsed:.2f}s ({rate:.0f} rows/s)."
+            )
+        )
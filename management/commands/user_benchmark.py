@@ -0,0 +1,420 @@
+# user/management/commands/user_benchmark.py
+"""
+Micro-benchmarks for the user app.
+
+Every scenario runs inside a transaction that is rolled back, so it can be
+pointed at a development database without leaving rows behind. Do not run it
+against production.
+"""
+
+import time
+import tracemalloc
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from django.utils.text import slugify
+
+from user.availability import BloomFilter
+from user.emails import get_activation_base_url, render_activation_bodies
+from user.importer import import_users
+from user.models import User, UserSearchToken, _get_profile_model
+from user.search import build_search_tokens, search_users
+from user.serializers import BaseProfileSerializer, UserSummarySerializer
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+class _Rollback(Exception):
+    pass
+
+
+class SkipBenchmark(Exception):
+    """Raised by a scenario that cannot run with the given options."""
+
+
+def timed(func, setup=None):
+    """
+    Run ``func`` in a rolled-back transaction and return elapsed seconds.
+    ``setup`` runs first, outside the clock, and its result is passed to ``func``.
+    """
+    return timed_each([func], setup)[0]
+
+
+def timed_each(funcs, setup=None):
+    """Like ``timed``, but times every function against one shared setup."""
+    elapsed = []
+    try:
+        with transaction.atomic():
+            args = (setup(),) if setup else ()
+            for func in funcs:
+                started = time.perf_counter()
+                func(*args)
+                elapsed.append(time.perf_counter() - started)
+            raise _Rollback
+    except _Rollback:
+        pass
+    return elapsed
+
+
+def _roster(rows, prefix, user_type):
+    return [
+        {
+            "username": f"{prefix}.{index}",
+            "email": f"{prefix}.{index}@example.com",
+            "first_name": "Bench",
+            "last_name": f"User{index}",
+            "user_type": user_type,
+        }
+        for index in range(rows)
+    ]
+
+
+@benchmark("import")
+def bench_import(rows=2000, organization=None, **_options):
+    """Bulk importer against one ``create_user`` call per row."""
+    user_type = User.UserType.ATTENDEE if organization else User.UserType.OTHER
+
+    def _per_row():
+        for row in _roster(rows, "bench.single", user_type):
+            user = User.objects.create_user(
+                username=row["username"],
+                email=row["email"],
+                first_name=row["first_name"],
+                last_name=row["last_name"],
+                user_type=row["user_type"],
+                is_active=True,
+            )
+            if organization:
+                profile = user.get_profile()
+                if profile:
+                    profile.organization_id = organization
+                    profile.save(update_fields=["organization"])
+
+    def _bulk():
+        import_users(
+            _roster(rows, "bench.bulk", user_type),
+            organization=organization,
+            active=True,
+            send_email=False,
+        )
+
+    return [("create_user per row", timed(_per_row), rows), ("import_users", timed(_bulk), rows)]
+
+
+@benchmark("slugs")
+def bench_slugs(rows=2000, organization=None, **_options):
+    """Same-name profiles: legacy exists() probing against the slug allocator."""
+    if not organization:
+        raise SkipBenchmark("needs --organization")
+    model = _get_profile_model(User.UserType.ATTENDEE)
+    # Probing is quadratic in queries; keep its sample small enough to finish.
+    probing_rows = min(rows, 500)
+
+    def _users(count):
+        def _setup():
+            return User.objects.bulk_create(
+                User(
+                    username=f"bench.slug.{index}",
+                    first_name="John",
+                    last_name="Smith",
+                    user_type=User.UserType.ATTENDEE,
+                    password=make_password(None),
+                )
+                for index in range(count)
+            )
+
+        return _setup
+
+    def _probing(users):
+        for user in users:
+            base = slugify(f"{user.first_name} {user.last_name}")
+            slug, counter = base, 1
+            while model.objects.filter(slug=slug).exists():
+                slug = f"{base}-{counter}"
+                counter += 1
+            model.objects.create(user=user, organization_id=organization, slug=slug)
+
+    def _allocator(users):
+        for user in users:
+            model.objects.create(user=user, organization_id=organization)
+
+    return [
+        ("exists() probing", timed(_probing, _users(probing_rows)), probing_rows),
+        ("counter allocator", timed(_allocator, _users(rows)), rows),
+    ]
+
+
+@benchmark("activation-render")
+def bench_activation_render(rows=2000, **_options):
+    """Per-message render_to_string + reverse() against the batch renderer."""
+    users = [
+        User(
+            pk=index + 1,
+            username=f"bench.render.{index}",
+            email=f"bench.render.{index}@example.com",
+            first_name="Bench",
+            last_name=f"User{index}",
+            password=make_password(None),
+        )
+        for index in range(rows)
+    ]
+    base_url = get_activation_base_url()
+
+    def _per_message():
+        for user in users:
+            uid = urlsafe_base64_encode(force_bytes(user.pk))
+            token = default_token_generator.make_token(user)
+            link = reverse("activate", kwargs={"uidb64": uid, "token": token})
+            render_to_string(
+                "email/activation_email.html",
+                {"user": user, "activation_url": f"{base_url}{link}"},
+            )
+
+    def _batch():
+        render_activation_bodies(users, base_url)
+
+    # Warm both paths so template compilation is not billed to either side.
+    render_activation_bodies(users[:1], base_url)
+    return [
+        ("render_to_string per message", timed(_per_message), rows),
+        ("render_activation_bodies", timed(_batch), rows),
+    ]
+
+
+@benchmark("availability")
+def bench_availability(rows=2000, **_options):
+    """Bloom filter build and lookup cost for ``rows`` usernames (no DB)."""
+    names = [f"camper.{index}" for index in range(rows)]
+    bloom = BloomFilter(rows)
+
+    started = time.perf_counter()
+    for name in names:
+        bloom.add(name)
+    build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    false_positives = sum(f"absent.{index}" in bloom for index in range(rows))
+    lookup = time.perf_counter() - started
+
+    size = f"{bloom.nbytes / 1024:.0f} KiB, {false_positives / rows:.2%} false positives"
+    return [(f"bloom add ({size})", build, rows), ("bloom lookup (misses)", lookup, rows)]
+
+
+@benchmark("serializers")
+def bench_serializers(rows=10_000, organization=None, **_options):
+    """ModelSerializer(many=True) against the values_list() path."""
+    prefix = "bench.serial"
+
+    def _users():
+        users = User.objects.bulk_create(
+            User(
+                username=f"{prefix}.{index}",
+                email=f"{prefix}.{index}@example.com",
+                first_name="Bench",
+                last_name=f"User{index}",
+                user_type=User.UserType.ATTENDEE,
+                password=make_password(None),
+            )
+            for index in range(rows)
+        )
+        if organization:
+            model = _get_profile_model(User.UserType.ATTENDEE)
+            model.objects.bulk_create(
+                model(user=user, organization_id=organization, slug=user.username.replace(".", "-"))
+                for user in User.objects.filter(username__startswith=prefix)
+            )
+        return User.objects.filter(username__startswith=prefix).order_by("pk")
+
+    def _model_serializer(queryset):
+        return UserSummarySerializer(queryset, many=True).data
+
+    results = [
+        ("UserSummarySerializer", timed(_model_serializer, _users), rows),
+        ("UserSummarySerializer values", timed(UserSummarySerializer.values_data, _users), rows),
+    ]
+    if not organization:
+        return results
+
+    class ProfileSerializer(BaseProfileSerializer):
+        class Meta(BaseProfileSerializer.Meta):
+            model = _get_profile_model(User.UserType.ATTENDEE)
+
+    def _profiles():
+        return ProfileSerializer.Meta.model.objects.filter(user__in=_users()).order_by("pk")
+
+    def _profile_serializer(queryset):
+        return ProfileSerializer(queryset.select_related("user"), many=True).data
+
+    return results + [
+        ("BaseProfileSerializer", timed(_profile_serializer, _profiles), rows),
+        ("BaseProfileSerializer values", timed(ProfileSerializer.values_data, _profiles), rows),
+    ]
+
+
+@benchmark("search")
+def bench_search(rows=100_000, **_options):
+    """Admin user search: icontains over four columns against the token index."""
+    first_names = ["Avery", "Jordan", "Riley", "Morgan", "Casey", "Quinn", "Rowan", "Sage"]
+    step = max(rows // 40, 1)
+    terms = [f"user{index}" for index in range(0, rows, step)][:40]
+    terms += [name.lower() for name in first_names] + ["bench.search.1", "nobody"]
+    password = make_password(None)
+
+    def _setup():
+        for start in range(0, rows, 5000):
+            users = User.objects.bulk_create(
+                User(
+                    username=f"bench.search.{index}",
+                    email=f"bench.search.{index}@example.com",
+                    first_name=first_names[index % len(first_names)],
+                    last_name=f"User{index}",
+                    user_type=User.UserType.OTHER,
+                    password=password,
+                )
+                for index in range(start, min(start + 5000, rows))
+            )
+            UserSearchToken.objects.bulk_create(
+                [token for user in users for token in build_search_tokens(user)]
+            )
+
+    def _page(queryset):
+        return list(queryset.order_by("username").values_list("pk", flat=True)[:25])
+
+    def _icontains():
+        for term in terms:
+            _page(
+                User.objects.filter(
+                    Q(username__icontains=term)
+                    | Q(email__icontains=term)
+                    | Q(first_name__icontains=term)
+                    | Q(last_name__icontains=term)
+                )
+            )
+
+    def _indexed():
+        for term in terms:
+            _page(search_users(User.objects.all(), term))
+
+    seconds = timed_each([_icontains, _indexed], _setup)
+    label = f"{rows} users"
+    return [
+        (f"icontains search ({label})", seconds[0], len(terms)),
+        (f"search_users ({label})", seconds[1], len(terms)),
+    ]
+
+
+def _traced(func):
+    """Run ``func`` under tracemalloc; return (seconds, peak MiB)."""
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+@benchmark("roster")
+def bench_roster(rows=50_000, **_options):
+    """Peak memory of a full attendee roster: User instances against RosterRow."""
+    password = make_password(None)
+    prefix = "bench.roster"
+    measured = {}
+
+    def _setup():
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f"{prefix}.{index}",
+                    email=f"{prefix}.{index}@example.com",
+                    first_name="Bench",
+                    last_name=f"User{index}",
+                    user_type=User.UserType.ATTENDEE,
+                    password=password,
+                )
+                for index in range(rows)
+            ),
+            batch_size=5000,
+        )
+        return User.objects.filter(
+            user_type=User.UserType.ATTENDEE, username__startswith=prefix
+        ).order_by("username")
+
+    def _instances(queryset):
+        measured["instances"] = _traced(lambda: list(queryset.with_profiles()))
+
+    def _roster(queryset):
+        measured["roster"] = _traced(lambda: list(queryset.roster(User.UserType.ATTENDEE)))
+
+    timed_each([_instances, _roster], _setup)
+    return [
+        (f"{label} (peak {peak:.1f} MiB)", seconds, rows)
+        for label, (seconds, peak) in (
+            ("User instances", measured["instances"]),
+            ("RosterRow", measured["roster"]),
+        )
+    ]
+
+
+class Command(BaseCommand):
+    help = "Run user app micro-benchmarks in a rolled-back transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenarios",
+            nargs="*",
+            help=f"Scenarios to run (default: all). Available: {', '.join(sorted(BENCHMARKS))}.",
+        )
+        parser.add_argument(
+            "--rows",
+            type=int,
+            help=(
+                "Rows per scenario (default: 2000; 10000 for serializers, "
+                "50000 for roster, 100000 for search)."
+            ),
+        )
+        parser.add_argument(
+            "--organization",
+            type=int,
+            help="Organization id used when a scenario needs role profiles.",
+        )
+
+    def handle(self, *args, **options):
+        names = options["scenarios"] or sorted(BENCHMARKS)
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(unknown)}")
+
+        if options["rows"] is None:
+            # Fall back to each scenario's own default.
+            del options["rows"]
+
+        for name in names:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            try:
+                results = BENCHMARKS[name](**options)
+            except SkipBenchmark as exc:
+                self.stdout.write(self.style.WARNING(f"  skipped: {exc}"))
+                continue
+            for label, seconds, count in results:
+                rate = count / seconds if seconds else 0.0
+                self.stdout.write(
+                    f"  {label:<32} {count:>8} ops  {seconds:8.3f}s  {rate:12.1f} ops/s"
+                )
@@ -0,0 +1,200 @@
+# user/managers.py
+
+from functools import partial
+
+from django.contrib.auth.models import UserManager as DjangoUserManager
+from django.db import models
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import Coalesce
+from django.db.models.query import ValuesListIterable
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+class RosterRow:
+    """Read-only user row for roster pages; see ``UserQuerySet.roster()``."""
+
+    __slots__ = (
+        "id",
+        "username",
+        "first_name",
+        "last_name",
+        "email",
+        "user_type",
+        "is_active",
+        "profile_slug",
+        "organization_id",
+    )
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_full_name(self):
+        return f"{self.first_name} {self.last_name}"
+
+    def __eq__(self, other):
+        return isinstance(other, RosterRow) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"<RosterRow: {self.username}>"
+
+
+class RosterIterable(ValuesListIterable):
+    def __iter__(self):
+        for row in super().__iter__():
+            yield RosterRow(*row)
+
+
+def roster(queryset, user_type=None):
+    """
+    ``queryset`` narrowed to ``RosterRow.__slots__``, yielding ``RosterRow``
+    objects. With ``user_type`` only that role's users are kept and the
+    profile slug and organization id come from its profile; with None every
+    user is kept, with whichever role profile they have.
+    """
+    from user.models import PROFILE_MODEL_MAP, get_profile_accessor
+
+    if user_type:
+        queryset = queryset.filter(user_type=user_type)
+    user_types = [user_type] if user_type else list(PROFILE_MODEL_MAP)
+    accessors = [
+        accessor
+        for accessor in dict.fromkeys(get_profile_accessor(role) for role in user_types)
+        if accessor
+    ]
+
+    def _profile_column(name):
+        if not accessors:
+            return models.Value(None, output_field=models.CharField())
+        if len(accessors) == 1:
+            return F(f"{accessors[0]}__{name}")
+        return Coalesce(*(F(f"{accessor}__{name}") for accessor in accessors))
+
+    clone = queryset.values_list(
+        *RosterRow.__slots__[:-2],
+        _profile_column("slug"),
+        _profile_column("organization_id"),
+    )
+    # QuerySet has no public hook for the row type; values_list() leaves the
+    # clone on ValuesListIterable, which RosterIterable only wraps. Keep this
+    # the single place that sets it.
+    clone._iterable_class = RosterIterable
+    return clone
+
+
+class UserQuerySet(models.QuerySet):
+    def with_profiles(self, *related):
+        """
+        Join every ``PROFILE_MODEL_MAP`` profile onto the users so
+        ``User.get_profile()`` never queries. ``related`` names profile
+        relations to follow as well, e.g. ``with_profiles("organization")``.
+        """
+        from user.models import profile_accessors
+
+        lookups = []
+        for accessor in profile_accessors():
+            lookups.append(accessor)
+            lookups.extend(f"{accessor}__{name}" for name in related)
+        return self.select_related(*lookups)
+
+    def unactivated(self, joined_before=None):
+        """
+        Registrations that were never activated, matching the partial
+        ``user_unactivated_joined_idx`` index.
+        """
+        queryset = self.filter(is_active=False, is_new_user=True, last_login__isnull=True)
+        if joined_before is not None:
+            queryset = queryset.filter(date_joined__lt=joined_before)
+        return queryset
+
+    def roster(self, user_type=None):
+        """Narrow ``RosterRow`` objects instead of ``User`` instances."""
+        return roster(self, user_type)
+
+    def with_enrollments(self):
+        """Prefetch enrollments so ``User.get_enrollments()`` does not query."""
+        from user.models import get_enrollment_relation
+
+        accessor, _query_name = get_enrollment_relation()
+        return self.prefetch_related(accessor)
+
+    def with_enrollment_stats(self):
+        """
+        Annotate ``enrollment_count``, ``active_enrollment_count`` and
+        ``latest_enrollment_date`` in the same aggregated query. Active means
+        started on or before today and not yet ended.
+        """
+        from user.models import get_enrollment_date_fields, get_enrollment_relation
+
+        _accessor, relation = get_enrollment_relation()
+        start, end = get_enrollment_date_fields()
+        today = timezone.localdate()
+
+        def day(field):
+            # Datetime columns are compared by their local date.
+            suffix = "__date" if isinstance(field, models.DateTimeField) else ""
+            return f"{relation}__{field.name}{suffix}"
+
+        active = Q(**{f"{day(start)}__lte": today})
+        if end is not None:
+            active &= Q(**{f"{day(end)}__gte": today}) | Q(
+                **{f"{relation}__{end.name}__isnull": True}
+            )
+        return self.annotate(
+            enrollment_count=Count(relation, distinct=True),
+            active_enrollment_count=Count(relation, filter=active, distinct=True),
+            latest_enrollment_date=Max(f"{relation}__{start.name}"),
+        )
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    use_in_migrations = True
+
+
+class LazyManager:
+    """
+    Class attribute that imports and binds a manager on first access, so the
+    module defining it is not imported together with ``user.models``.
+
+    The manager is not registered in ``Model._meta.managers``; use it only for
+    secondary managers that are not the default manager or used in migrations.
+
+    With ``user_type`` the manager also gets ``roster()``, which joins that
+    role's profile onto ``get_queryset()`` (see ``UserQuerySet.roster()``).
+    """
+
+    def __init__(self, path, user_type=None):
+        self.path = path
+        self.user_type = user_type
+        self.name = None
+        self._managers = {}
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is not None:
+            raise AttributeError(
+                f"Manager isn't accessible via {owner.__name__} instances"
+            )
+        manager = self._managers.get(owner)
+        if manager is None:
+            manager = import_string(self.path)()
+            manager.name = self.name
+            manager.model = owner
+            if self.user_type is not None:
+                manager.roster = partial(_manager_roster, manager, self.user_type)
+            self._managers[owner] = manager
+        return manager
+
+
+def _manager_roster(manager, user_type):
+    return roster(manager.get_queryset(), user_type)
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user", "0014_remove_user_slug_alter_user_user_type"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProfileSlugCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=100)),
+                ("base", models.SlugField(db_index=False, max_length=255)),
+                ("last_suffix", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("scope", "base"),
+                        name="user_profileslugcounter_scope_base",
+                    )
+                ],
+            },
+        ),
+    ]
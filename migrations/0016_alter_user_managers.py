@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-17 10:05
+
+from django.db import migrations
+import user.managers
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user", "0015_profileslugcounter"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", user.managers.UserManager()),
+            ],
+        ),
+    ]
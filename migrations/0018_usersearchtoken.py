@@ -0,0 +1,111 @@
+# Generated by Django 5.0.6 on 2026-10-17 14:05
+
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError, migrations, models, transaction
+
+TRIGRAM_INDEX = "user_usersearchtoken_token_trgm"
+
+
+def create_trigram_index(apps, schema_editor):
+    # Substring search on PostgreSQL; other backends only use prefix lookups.
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql" or not getattr(settings, "USER_SEARCH_TRIGRAM", True):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        installed = cursor.fetchone() is not None
+    if not installed:
+        # Creating an extension needs superuser or database owner rights.
+        try:
+            with transaction.atomic(using=connection.alias):
+                schema_editor.execute("CREATE EXTENSION pg_trgm")
+        except DatabaseError as exc:
+            raise ImproperlyConfigured(
+                "The pg_trgm extension is missing and could not be created. Run "
+                "CREATE EXTENSION pg_trgm as a superuser, or set "
+                "USER_SEARCH_TRIGRAM = False, then migrate again."
+            ) from exc
+    table = apps.get_model("user", "UserSearchToken")._meta.db_table
+    schema_editor.execute(
+        f"CREATE INDEX {TRIGRAM_INDEX} ON {schema_editor.quote_name(table)} "
+        "USING gin (token gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+
+def _normalize(value):
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return value.casefold().strip()
+
+
+def user_tokens(username, email, first_name, last_name):
+    # Frozen copy of user.search.user_tokens without the profile slug.
+    tokens = {_normalize(username), _normalize(email)}
+    for name in (first_name, last_name):
+        tokens.update(_normalize(name).split())
+    tokens.discard("")
+    return {token[:255] for token in tokens}
+
+
+def backfill_tokens(apps, schema_editor):
+    # Profile slugs are added by the profile save receivers or by running
+    # ``manage.py rebuild_user_search``; names and emails are indexed here.
+    User = apps.get_model("user", "User")
+    UserSearchToken = apps.get_model("user", "UserSearchToken")
+    alias = schema_editor.connection.alias
+    batch = []
+    rows = (
+        User.objects.using(alias)
+        .values_list("pk", "username", "email", "first_name", "last_name")
+        .iterator(chunk_size=2000)
+    )
+    for pk, *fields in rows:
+        batch.extend(UserSearchToken(user_id=pk, token=token) for token in user_tokens(*fields))
+        if len(batch) >= 5000:
+            UserSearchToken.objects.using(alias).bulk_create(batch)
+            batch = []
+    UserSearchToken.objects.using(alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("user", "0017_emailoutbox"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserSearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("token", models.CharField(db_index=True, max_length=255)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(backfill_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.6 on 2026-10-17 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user", "0018_usersearchtoken"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["user_type", "is_active", "username"],
+                name="user_role_active_username_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["-date_joined", "id"], name="user_joined_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("is_active", False), ("is_new_user", True)),
+                fields=["date_joined"],
+                name="user_unactivated_joined_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("is_staff", True)),
+                fields=["username"],
+                name="user_staff_username_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("is_admin", True)),
+                fields=["username"],
+                name="user_admin_username_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.0.6 on 2026-10-17 16:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+# Frozen copy of user.models.PROFILE_MODEL_MAP.
+PROFILE_MODELS = {
+    "FACULTY": ("facility", "FacultyProfile"),
+    "ATTENDEE": ("faction", "AttendeeProfile"),
+    "LEADER": ("faction", "LeaderProfile"),
+}
+
+
+def backfill_counts(apps, schema_editor):
+    # Same counting as user.counters.rebuild_organization_counts.
+    OrganizationRoleCount = apps.get_model("user", "OrganizationRoleCount")
+    alias = schema_editor.connection.alias
+    buckets = {}
+    for role, (app_label, model_name) in PROFILE_MODELS.items():
+        try:
+            model = apps.get_model(app_label, model_name)
+        except LookupError:
+            continue
+        rows = (
+            model.objects.using(alias)
+            .filter(user__user_type=role)
+            .order_by()
+            .values("organization_id", "user__is_active")
+            .annotate(total=Count("pk"))
+        )
+        for row in rows:
+            counts = buckets.setdefault((row["organization_id"], role), {})
+            column = "active" if row["user__is_active"] else "inactive"
+            counts[column] = counts.get(column, 0) + row["total"]
+    OrganizationRoleCount.objects.using(alias).bulk_create(
+        [
+            OrganizationRoleCount(organization_id=organization_id, user_type=role, **counts)
+            for (organization_id, role), counts in buckets.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("faction", "__first__"),
+        ("facility", "__first__"),
+        ("organization", "0001_initial"),
+        ("user", "0019_user_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrganizationRoleCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "user_type",
+                    models.CharField(
+                        choices=[
+                            ("ADMIN", "Admin"),
+                            ("ORGANIZATION_FACULTY", "Organization Faculty"),
+                            ("FACILITY_FACULTY", "Facility Faculty"),
+                            ("FACULTY", "Faculty"),
+                            ("LEADER", "Leader"),
+                            ("ATTENDEE", "Attendee"),
+                            ("OTHER", "Other"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                ("active", models.IntegerField(default=0)),
+                ("inactive", models.IntegerField(default=0)),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="user_role_counts",
+                        to="organization.organization",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("organization", "user_type"),
+                        name="user_orgrolecount_org_role",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
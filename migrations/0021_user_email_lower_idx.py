@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-17 17:10
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user", "0020_organizationrolecount"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                django.db.models.functions.text.Lower("email"), name="user_email_lower_idx"
+            ),
+        ),
+    ]
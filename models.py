@@ -1,18 +1,22 @@
 # user/models.py
 
-from django.contrib.auth.models import AbstractUser, UserManager
+from functools import lru_cache
+
+from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
 from django.db import models
+from django.db.models.functions import Lower
 from django.conf import settings
+from django.utils import timezone
 from django.utils.text import slugify
 
 
 from address.models import AddressField
-from facility.managers.faculty import FacultyManager
-from faction.managers.attendee import AttendeeManager
-from faction.managers.leader import LeaderManager
-from enrollment.models.enrollment import Enrollment
 from django.apps import apps
-from django.db import transaction
+from django.db import IntegrityError, transaction
+
+from .managers import LazyManager, UserManager
+from .slugs import MAX_ATTEMPTS, allocate_slug, slug_matches_base
 
 
 class User(AbstractUser):
@@ -34,25 +38,129 @@ class User(AbstractUser):
     # Default manager for general queries
     objects = UserManager()
 
-    # Specialized managers
-    faculty_manager = FacultyManager()
-    attendee_manager = AttendeeManager()
-    leader_manager = LeaderManager()
+    # Specialized managers, imported on first use to keep this module light
+    faculty_manager = LazyManager(
+        "facility.managers.faculty.FacultyManager", user_type=UserType.FACULTY
+    )
+    attendee_manager = LazyManager(
+        "faction.managers.attendee.AttendeeManager", user_type=UserType.ATTENDEE
+    )
+    leader_manager = LazyManager(
+        "faction.managers.leader.LeaderManager", user_type=UserType.LEADER
+    )
+
+    # Set on a new instance whose profile the caller saves itself in the same
+    # transaction, so ensure_profile does not insert a second one.
+    manages_own_profile = False
+
+    # Fields whose changes since load are tracked for the post_save receivers.
+    TRACKED_FIELDS = (
+        "username",
+        "email",
+        "first_name",
+        "last_name",
+        "user_type",
+        "is_active",
+        "is_admin",
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def _snapshot_tracked_fields(self, fields=None):
+        names = self.TRACKED_FIELDS if fields is None else (
+            name for name in fields if name in self.TRACKED_FIELDS
+        )
+        loaded = {} if fields is None else getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return
+        for name in names:
+            # Read __dict__ directly so deferred fields are never fetched.
+            if name in self.__dict__:
+                loaded[name] = self.__dict__[name]
+        self._loaded_values = loaded
+
+    def get_dirty_fields(self):
+        """
+        Return the tracked fields that changed since the instance was loaded or
+        last saved. Instances that were never loaded report every field set.
+        """
+        loaded = getattr(self, "_loaded_values", None)
+        present = [name for name in self.TRACKED_FIELDS if name in self.__dict__]
+        if loaded is None:
+            return set(present)
+        return {
+            name
+            for name in present
+            if name not in loaded or loaded[name] != self.__dict__[name]
+        }
+
+    def has_changed(self, *fields):
+        return bool(self.get_dirty_fields().intersection(fields))
+
+    def get_previous_value(self, name):
+        """Value of tracked field ``name`` as of the last load or save."""
+        loaded = getattr(self, "_loaded_values", None) or {}
+        return loaded.get(name, getattr(self, name))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot_tracked_fields(kwargs.get("update_fields"))
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._snapshot_tracked_fields(kwargs.get("fields"))
 
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}"
 
     def get_profile(self):
-        if self.user_type == User.UserType.ATTENDEE:
-            return getattr(self, "attendeeprofile_profile", None)
-        elif self.user_type == User.UserType.LEADER:
-            return getattr(self, "leaderprofile_profile", None)
-        elif self.user_type == User.UserType.FACULTY:
-            return getattr(self, "facultyprofile_profile", None)
-        return None
+        accessor = get_profile_accessor(self.user_type)
+        if accessor is None:
+            return None
+        return getattr(self, accessor, None)
 
     def get_enrollments(self):
-        return Enrollment.objects.filter(user=self)
+        """
+        The user's enrollments; reuses ``with_enrollments()`` prefetched rows
+        instead of querying again.
+        """
+        accessor, _query_name = get_enrollment_relation()
+        return getattr(self, accessor).all()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Role managers, UserAdmin filters and the dashboard counts
+            # (a covering index for the user_type/is_active GROUP BY).
+            models.Index(
+                fields=["user_type", "is_active", "username"],
+                name="user_role_active_username_idx",
+            ),
+            # Admin dashboard widget: newest users first, keyset by pk.
+            models.Index(fields=["-date_joined", "id"], name="user_joined_idx"),
+            # Never-activated registrations, oldest first.
+            models.Index(
+                fields=["date_joined"],
+                condition=models.Q(is_active=False, is_new_user=True),
+                name="user_unactivated_joined_idx",
+            ),
+            # The small staff/admin subsets behind the UserAdmin boolean filters.
+            models.Index(
+                fields=["username"],
+                condition=models.Q(is_staff=True),
+                name="user_staff_username_idx",
+            ),
+            models.Index(
+                fields=["username"],
+                condition=models.Q(is_admin=True),
+                name="user_admin_username_idx",
+            ),
+            # Case-insensitive email lookups in find_user_conflicts.
+            models.Index(Lower("email"), name="user_email_lower_idx"),
+        ]
 
 
 PROFILE_MODEL_MAP = {
@@ -85,10 +193,38 @@ class BaseUserProfile(models.Model):
             return slugify(f"{self.user.first_name} {self.user.last_name}")
         return slugify(self.user.username)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The organization counters and the faculty facility cache need to know
+        # where a moved profile came from.
+        instance._loaded_organization_id = instance.__dict__.get("organization_id")
+        instance._loaded_user_id = instance.__dict__.get("user_id")
+        return instance
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = self.generate_slug()
-        super().save(*args, **kwargs)
+        if self.slug:
+            super().save(*args, **kwargs)
+        else:
+            self._save_with_new_slug(*args, **kwargs)
+        self._loaded_organization_id = self.organization_id
+        self._loaded_user_id = self.user_id
+
+    def _save_with_new_slug(self, *args, **kwargs):
+        # Counters are locked per base, so a concurrent allocation for the base
+        # "john-smith-1" can commit the slug this one drew from "john-smith";
+        # take the next suffix when the insert hits the unique constraint.
+        model = type(self)
+        for attempt in range(MAX_ATTEMPTS):
+            self.slug = allocate_slug(model, self.generate_slug())
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                taken = model._base_manager.filter(slug=self.slug).exclude(pk=self.pk).exists()
+                if not taken or attempt == MAX_ATTEMPTS - 1:
+                    raise
 
     class Meta:
         abstract = True
@@ -99,6 +235,107 @@ class AdminProfile(BaseUserProfile):
         abstract = True
 
 
+class ProfileSlugCounter(models.Model):
+    """Last slug suffix handed out per profile table and base slug."""
+
+    scope = models.CharField(max_length=100)
+    base = models.SlugField(max_length=255, db_index=False)
+    last_suffix = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope", "base"], name="user_profileslugcounter_scope_base"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.base}={self.last_suffix}"
+
+
+class EmailOutbox(models.Model):
+    """Account mail waiting to be sent by ``drain_email_outbox``."""
+
+    class Kind(models.TextChoices):
+        ACTIVATION = "ACTIVATION", "Activation"
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        SENT = "SENT", "Sent"
+        FAILED = "FAILED", "Failed"
+        CANCELLED = "CANCELLED", "Cancelled"
+
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    kind = models.CharField(max_length=50, choices=Kind.choices)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="outbox_messages",
+    )
+    recipient = models.EmailField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"],
+                name="user_outbox_status_due_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.kind} to {self.recipient} ({self.status})"
+
+
+class OrganizationRoleCount(models.Model):
+    """
+    Profiles per organization and role, split by account status. Maintained
+    by the profile and ``User`` receivers; see ``user.counters``.
+    """
+
+    organization = models.ForeignKey(
+        "organization.Organization",
+        on_delete=models.CASCADE,
+        related_name="user_role_counts",
+    )
+    user_type = models.CharField(max_length=50, choices=User.UserType.choices)
+    active = models.IntegerField(default=0)
+    inactive = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["organization", "user_type"],
+                name="user_orgrolecount_org_role",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.organization_id}:{self.user_type}={self.active}+{self.inactive}"
+
+
+class UserSearchToken(models.Model):
+    """
+    Normalized words a user can be found by (see ``user.search``). Kept in
+    sync by the ``User`` and profile save receivers.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="search_tokens",
+    )
+    token = models.CharField(max_length=255, db_index=True)
+
+    def __str__(self):
+        return self.token
+
+
 # Corrected signals
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -112,18 +349,87 @@ def _get_profile_model(user_type):
     return apps.get_model(app_label, model_name)
 
 
+def get_profile_accessor(user_type):
+    """Reverse one-to-one accessor on ``User`` for the role's profile model."""
+    model = _get_profile_model(user_type)
+    if model is None:
+        return None
+    return model._meta.get_field("user").remote_field.get_accessor_name()
+
+
+def profile_accessors():
+    return [get_profile_accessor(user_type) for user_type in PROFILE_MODEL_MAP]
+
+
+def get_enrollment_relation():
+    """``(accessor, query name)`` of the Enrollment -> User relation."""
+    from enrollment.models.enrollment import Enrollment
+
+    remote = Enrollment._meta.get_field("user").remote_field
+    return remote.get_accessor_name(), remote.field.related_query_name()
+
+
+def _enrollment_date_field(model, setting, default):
+    name = getattr(settings, setting, default)
+    if name is None:
+        return None
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        raise ImproperlyConfigured(
+            f"{setting} names Enrollment.{name}, which does not exist."
+        ) from None
+    if not isinstance(field, models.DateField):
+        raise ImproperlyConfigured(f"{setting} names Enrollment.{name}, which is not a date field.")
+    return field
+
+
+@lru_cache(maxsize=None)
+def get_enrollment_date_fields():
+    """
+    ``(start, end)`` date or datetime fields of ``Enrollment``, named by
+    ``USER_ENROLLMENT_START_FIELD`` (default ``start_date``) and
+    ``USER_ENROLLMENT_END_FIELD`` (default ``end_date``; None for
+    enrollments without an end date).
+    """
+    from enrollment.models.enrollment import Enrollment
+
+    start = _enrollment_date_field(Enrollment, "USER_ENROLLMENT_START_FIELD", "start_date")
+    if start is None:
+        raise ImproperlyConfigured("USER_ENROLLMENT_START_FIELD cannot be None.")
+    end = _enrollment_date_field(Enrollment, "USER_ENROLLMENT_END_FIELD", "end_date")
+    return start, end
+
+
+# User fields that feed BaseUserProfile.generate_slug() or pick the profile table.
+PROFILE_SOURCE_FIELDS = frozenset({"first_name", "last_name", "username", "user_type"})
+
+
 @receiver(post_save, sender=User)
-@transaction.atomic
-def ensure_profile(sender, instance, created, **kwargs):
+def ensure_profile(sender, instance, created, update_fields=None, **kwargs):
     """
     Create the related profile when a user is added and keep its slug in sync
     whenever identifying fields change.
     """
 
+    if created and instance.manages_own_profile:
+        return
+    if not created:
+        # Logins (last_login) and activations (is_active) must not lock the profile.
+        if update_fields is not None and not PROFILE_SOURCE_FIELDS & set(update_fields):
+            return
+        if not instance.has_changed(*PROFILE_SOURCE_FIELDS):
+            return
+
     model = _get_profile_model(instance.user_type)
     if not model:
         return
 
+    with transaction.atomic():
+        _sync_profile(model, instance, created)
+
+
+def _sync_profile(model, instance, created):
     profile = (
         model.objects.select_for_update()
         .filter(user=instance)
@@ -133,11 +439,14 @@ def ensure_profile(sender, instance, created, **kwargs):
     if not profile:
         if not created:
             return
-        profile = model.objects.create(user=instance)
+        profile = model(user=instance)
+        # The row was just inserted; spares the counters re-reading it.
+        profile._user_state = (instance.user_type, instance.is_active)
+        profile.save(force_insert=True)
 
     if not profile:
         return
 
-    desired_slug = profile.generate_slug()
-    if profile.slug != desired_slug:
-        model.objects.filter(pk=profile.pk).update(slug=desired_slug)
+    base = profile.generate_slug()
+    if not slug_matches_base(profile.slug, base):
+        model.objects.filter(pk=profile.pk).update(slug=allocate_slug(model, base))
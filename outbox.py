@@ -0,0 +1,157 @@
+# user/outbox.py
+"""
+Durable outbox for account mail.
+
+Senders only insert an ``EmailOutbox`` row, inside the same transaction as the
+change that caused the mail. ``drain_outbox`` later claims due rows in large
+batches (``SELECT ... FOR UPDATE SKIP LOCKED`` plus a lease, so concurrent
+drainers never share a row), hands them to the pooled ``MailWorker`` and
+records the outcome. Failures are retried with exponential backoff until
+``MAX_ATTEMPTS``. Every row carries an idempotency key: it makes enqueueing
+the same mail twice a no-op and is turned into a stable ``Message-ID`` header
+so downstream relays can drop duplicates after a crash mid-batch.
+"""
+
+import hashlib
+from datetime import timedelta
+from functools import partial
+
+from django.core.mail.utils import DNS_NAME
+from django.db import transaction
+from django.utils import timezone
+
+from core.logging import log_event
+
+from .emails import build_activation_messages, get_activation_base_url, needs_activation_email
+from .mail import get_mail_worker
+from .models import EmailOutbox
+
+DEFAULT_BATCH_SIZE = 500
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 60
+BACKOFF_MAX_SECONDS = 6 * 60 * 60
+# How long a claimed row stays invisible to other drainers.
+CLAIM_LEASE = timedelta(minutes=10)
+
+
+def activation_key(user):
+    return f"activation:{user.pk}"
+
+
+def enqueue_activation_emails(users):
+    """Add activation rows for ``users`` that still need one; returns the count."""
+    rows = [
+        EmailOutbox(
+            idempotency_key=activation_key(user),
+            kind=EmailOutbox.Kind.ACTIVATION,
+            user=user,
+            recipient=user.email,
+        )
+        for user in users
+        if needs_activation_email(user)
+    ]
+    if rows:
+        EmailOutbox.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def backoff_delay(attempts):
+    return timedelta(
+        seconds=min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS)
+    )
+
+
+def message_id(idempotency_key):
+    digest = hashlib.sha256(idempotency_key.encode()).hexdigest()[:32]
+    return f"<{digest}@{DNS_NAME}>"
+
+
+def claim_batch(batch_size=DEFAULT_BATCH_SIZE):
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("user")
+            .filter(status=EmailOutbox.Status.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "pk")[:batch_size]
+        )
+        if rows:
+            EmailOutbox.objects.filter(pk__in=[row.pk for row in rows]).update(
+                next_attempt_at=now + CLAIM_LEASE
+            )
+    return rows
+
+
+def _build_messages(rows, base_url):
+    """
+    Return ``{row.pk: message}`` for the rows that still need sending, built
+    in one batch per kind.
+    """
+    activation = [
+        row
+        for row in rows
+        if row.kind == EmailOutbox.Kind.ACTIVATION and needs_activation_email(row.user)
+    ]
+    messages = build_activation_messages(
+        [row.user for row in activation],
+        base_url,
+        headers=[{"Message-ID": message_id(row.idempotency_key)} for row in activation],
+    )
+    return {row.pk: message for row, message in zip(activation, messages)}
+
+
+def drain_outbox(batch_size=DEFAULT_BATCH_SIZE, worker=None, max_attempts=MAX_ATTEMPTS):
+    """Claim and send one batch of due rows; returns per-outcome counts."""
+    rows = claim_batch(batch_size)
+    result = {"claimed": len(rows), "sent": 0, "cancelled": 0, "retrying": 0, "failed": 0}
+    if not rows:
+        return result
+
+    worker = worker or get_mail_worker()
+    base_url = get_activation_base_url()
+    sent_ids = []
+    cancelled_ids = []
+    errors = {}
+    messages = _build_messages(rows, base_url)
+    for row in rows:
+        message = messages.get(row.pk)
+        if message is None:
+            cancelled_ids.append(row.pk)
+        elif not worker.submit(message, on_sent=partial(sent_ids.append, row.pk)):
+            errors[row.pk] = "mail queue full"
+    worker.flush()
+
+    now = timezone.now()
+    sent = set(sent_ids)
+    retry = []
+    for row in rows:
+        if row.pk in sent or row.pk in cancelled_ids:
+            continue
+        row.attempts += 1
+        row.last_error = errors.get(row.pk, "delivery failed")[:1000]
+        if row.attempts >= max_attempts:
+            row.status = EmailOutbox.Status.FAILED
+            result["failed"] += 1
+        else:
+            row.next_attempt_at = now + backoff_delay(row.attempts)
+            result["retrying"] += 1
+        retry.append(row)
+
+    with transaction.atomic():
+        if sent:
+            EmailOutbox.objects.filter(pk__in=sent).update(
+                status=EmailOutbox.Status.SENT, sent_at=now, last_error=""
+            )
+        if cancelled_ids:
+            EmailOutbox.objects.filter(pk__in=cancelled_ids).update(
+                status=EmailOutbox.Status.CANCELLED
+            )
+        if retry:
+            EmailOutbox.objects.bulk_update(
+                retry, ["attempts", "last_error", "status", "next_attempt_at"]
+            )
+
+    result["sent"] = len(sent)
+    result["cancelled"] = len(cancelled_ids)
+    log_event("email.outbox.drained", extra=result)
+    return result
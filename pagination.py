@@ -0,0 +1,246 @@
+# user/pagination.py
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with ``WHERE (a, b, id) > (...)``-style predicates on an
+ordering that ends in a unique column, so deep pages cost the same as the
+first one and no ``COUNT(*)`` is ever issued. Cursors are signed tokens
+holding the boundary row's ordering values.
+"""
+
+from functools import reduce
+from operator import or_
+
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = "user.pagination.keyset"
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    """
+    One page of rows. Mirrors the parts of Django's ``Page`` that templates
+    use (``number``, ``paginator``, ``has_next``, ``start_index`` ...); the
+    page number travels in the cursor, as no total is ever counted.
+    """
+
+    def __init__(
+        self, object_list, next_cursor=None, previous_cursor=None, number=1, paginator=None
+    ):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.number = number
+        self.paginator = paginator
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return (self.number - 1) * self.paginator.per_page + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` by ``ordering`` (field names, ``-`` for descending).
+    ``pk`` is appended as the tie-breaker when the ordering does not end in it.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        ordering = list(ordering)
+        if ordering[-1].lstrip("-") not in ("pk", "id"):
+            ordering.append("pk")
+        self.queryset = queryset
+        self.per_page = per_page
+        self.fields = [
+            (name.lstrip("-"), name.startswith("-")) for name in ordering
+        ]
+        self.model = queryset.model
+
+    def _order_by(self, reverse=False):
+        return [
+            f"-{name}" if descending != reverse else name
+            for name, descending in self.fields
+        ]
+
+    def _field(self, name):
+        if name == "pk":
+            return self.model._meta.pk
+        return self.model._meta.get_field(name)
+
+    def _values(self, obj):
+        return [getattr(obj, name) for name, _ in self.fields]
+
+    def encode_cursor(self, obj, direction, number=None):
+        """``number`` is the page the cursor leads to."""
+        values = [
+            value.isoformat() if hasattr(value, "isoformat") else value
+            for value in self._values(obj)
+        ]
+        payload = {"d": direction, "v": values}
+        if number is not None:
+            payload["n"] = number
+        return signing.dumps(payload, salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, token):
+        """Return ``(direction, values, page number)``."""
+        try:
+            payload = signing.loads(token, salt=CURSOR_SALT)
+            direction, raw = payload["d"], payload["v"]
+            number = int(payload.get("n", 1))
+            if direction not in ("next", "prev") or len(raw) != len(self.fields):
+                raise ValueError(direction)
+            values = [
+                self._field(name).to_python(value)
+                for (name, _), value in zip(self.fields, raw)
+            ]
+        except (signing.BadSignature, KeyError, TypeError, ValueError) as exc:
+            raise InvalidCursor(str(exc)) from exc
+        return direction, values, max(number, 1)
+
+    def _beyond(self, values, reverse):
+        """Rows strictly after ``values`` in the (optionally reversed) ordering."""
+        clauses = []
+        for index, (name, descending) in enumerate(self.fields):
+            lookup = "lt" if descending != reverse else "gt"
+            condition = {
+                prefix: value
+                for (prefix, _), value in zip(self.fields[:index], values[:index])
+            }
+            condition[f"{name}__{lookup}"] = values[index]
+            clauses.append(Q(**condition))
+        # Redundant bound on the leading column keeps the scan on its index.
+        name, descending = self.fields[0]
+        leading = Q(**{f"{name}__{'lte' if descending != reverse else 'gte'}": values[0]})
+        return leading & reduce(or_, clauses)
+
+    def page(self, cursor=None):
+        direction, values, number = ("next", None, 1)
+        if cursor:
+            direction, values, number = self.decode_cursor(cursor)
+
+        reverse = direction == "prev"
+        queryset = self.queryset.order_by(*self._order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self._beyond(values, reverse))
+
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse:
+            rows.reverse()
+        if not rows:
+            return KeysetPage(rows, number=number, paginator=self)
+
+        if reverse:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        # A backwards walk can meet the first page before the numbers run out.
+        number = number if has_previous else 1
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], "next", number + 1) if has_next else None,
+            previous_cursor=(
+                self.encode_cursor(rows[0], "prev", number - 1) if has_previous else None
+            ),
+            number=number,
+            paginator=self,
+        )
+
+
+class KeysetPaginationMixin:
+    """
+    Keyset pagination for ``BaseTableListView`` subclasses. ``?order=`` picks
+    one of ``keyset_orderings``; ``?cursor=`` carries the page token.
+
+    Templates get ``page_obj`` plus ``next_page_url``/``previous_page_url``;
+    ``{% include "user/includes/keyset_pagination.html" %}`` renders the links.
+    """
+
+    paginate_by = 25
+    keyset_orderings = {
+        "username": ("username",),
+        "date_joined": ("-date_joined",),
+        "user_type": ("user_type", "username"),
+    }
+    default_keyset_ordering = "username"
+    cursor_param = "cursor"
+    order_param = "order"
+
+    def get_keyset_ordering_key(self):
+        key = self.request.GET.get(self.order_param)
+        return key if key in self.keyset_orderings else self.default_keyset_ordering
+
+    def get_keyset_page(self):
+        if not hasattr(self, "_keyset_page"):
+            paginator = KeysetPaginator(
+                self.get_queryset(),
+                self.keyset_orderings[self.get_keyset_ordering_key()],
+                self.get_paginate_by(None),
+            )
+            try:
+                self._keyset_page = paginator.page(self.request.GET.get(self.cursor_param))
+            except InvalidCursor:
+                self._keyset_page = paginator.page()
+        return self._keyset_page
+
+    def _cursor_url(self, cursor):
+        if cursor is None:
+            return None
+        params = self.request.GET.copy()
+        params[self.cursor_param] = cursor
+        return f"?{params.urlencode()}"
+
+    def paginate_queryset(self, queryset, page_size):
+        page = self.get_keyset_page()
+        return (page.paginator, page, page.object_list, page.has_other_pages())
+
+    def get_table_data(self):
+        return self.get_keyset_page().object_list
+
+    def get_table_pagination(self, table):
+        return False
+
+    def get_table_kwargs(self):
+        kwargs = super().get_table_kwargs()
+        # Column sorting would only reorder the current page.
+        kwargs["orderable"] = False
+        return kwargs
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = self.get_keyset_page()
+        context["keyset_order"] = self.get_keyset_ordering_key()
+        context["next_page_url"] = self._cursor_url(page.next_cursor)
+        context["previous_page_url"] = self._cursor_url(page.previous_cursor)
+        return context
@@ -0,0 +1,70 @@
+# user/routes.py
+"""
+Reverse-once URL helpers and the cached faculty facility lookup used by
+``DashboardView``.
+
+``reverse_format`` resolves a URL name once per (script prefix, urlconf) into a
+``str.format`` template, so hot paths fill in kwargs without walking the
+resolver. Only use it with values that are already URL-safe (slugs, base64
+ids, tokens), since they are not re-quoted.
+"""
+
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import get_script_prefix, get_urlconf, reverse
+
+from .models import User, _get_profile_model
+
+FACULTY_FACILITY_TIMEOUT = 60 * 60
+_FACULTY_FACILITY_PREFIX = "user:faculty-facility"
+
+
+@lru_cache(maxsize=None)
+def _reverse_format(name, kwarg_names, script_prefix, urlconf):
+    sentinels = {kwarg: f"routesentinel{index}x" for index, kwarg in enumerate(kwarg_names)}
+    path = reverse(name, urlconf=urlconf, kwargs=sentinels or None)
+    path = path.replace("{", "{{").replace("}", "}}")
+    for kwarg, sentinel in sentinels.items():
+        path = path.replace(sentinel, f"{{{kwarg}}}")
+    return path
+
+
+def reverse_format(name, *kwarg_names):
+    """``str.format`` template for ``reverse(name, kwargs=...)``."""
+    return _reverse_format(name, tuple(kwarg_names), get_script_prefix(), get_urlconf())
+
+
+def cached_reverse(name, **kwargs):
+    return reverse_format(name, *sorted(kwargs)).format(**kwargs)
+
+
+@receiver(setting_changed)
+def _clear_route_cache(setting, **kwargs):
+    if setting == "ROOT_URLCONF":
+        _reverse_format.cache_clear()
+
+
+def _faculty_facility_key(user_id):
+    return f"{_FACULTY_FACILITY_PREFIX}:{user_id}"
+
+
+def get_faculty_facility_slug(user):
+    """Slug of the faculty member's facility, or None; one query on a miss."""
+    key = _faculty_facility_key(user.pk)
+    slug = cache.get(key)
+    if slug is None:
+        model = _get_profile_model(User.UserType.FACULTY)
+        slug = (
+            model.objects.filter(user_id=user.pk)
+            .values_list("facility__slug", flat=True)
+            .first()
+        ) or ""
+        cache.set(key, slug, FACULTY_FACILITY_TIMEOUT)
+    return slug or None
+
+
+def invalidate_faculty_facility_slugs(user_ids):
+    cache.delete_many([_faculty_facility_key(user_id) for user_id in user_ids])
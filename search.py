@@ -0,0 +1,127 @@
+# user/search.py
+"""
+Indexed user search over username, email, first/last name and profile slug.
+
+Every searchable word is stored normalized (accents stripped, casefolded) in
+``UserSearchToken``:
+
+- PostgreSQL: terms of three or more characters match anywhere in a token,
+  as the old ``icontains`` search did, through the ``pg_trgm`` GIN index from
+  migration 0018; shorter terms match token prefixes through the
+  ``varchar_pattern_ops`` index Django creates for ``db_index`` CharFields.
+  ``USER_SEARCH_TRIGRAM = False`` drops to prefix matching for every term.
+- SQLite and others: every term matches token prefixes only, through a
+  ``token >= term AND token < term + U+10FFFF`` range that the plain B-tree
+  index serves, plus the ``LIKE`` recheck. Substring matching would need a
+  ``LIKE '%term%'`` scan of the whole token table, several rows per user.
+
+Several terms must all match, each against any field.
+"""
+
+import unicodedata
+
+from django.conf import settings
+from django.db import connections, router
+
+from .models import PROFILE_MODEL_MAP, User, UserSearchToken, get_profile_accessor
+
+MAX_TERMS = 5
+TRIGRAM_MIN_LENGTH = 3
+_TOKEN_LENGTH = UserSearchToken._meta.get_field("token").max_length
+_RANGE_END = "\U0010ffff"
+
+
+def normalize(value):
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return value.casefold().strip()
+
+
+def user_tokens(username, email, first_name, last_name, profile_slug=None):
+    tokens = {normalize(username), normalize(email)}
+    for name in (first_name, last_name):
+        tokens.update(normalize(name).split())
+    if profile_slug:
+        tokens.add(normalize(profile_slug))
+    tokens.discard("")
+    return {token[:_TOKEN_LENGTH] for token in tokens}
+
+
+def build_search_tokens(user, profile_slug=None):
+    """Unsaved ``UserSearchToken`` rows for a user that has none yet."""
+    return [
+        UserSearchToken(user_id=user.pk, token=token)
+        for token in user_tokens(
+            user.username, user.email, user.first_name, user.last_name, profile_slug
+        )
+    ]
+
+
+def _profile_slug_lookups():
+    return {
+        user_type: f"{accessor}__slug"
+        for user_type, accessor in (
+            (user_type, get_profile_accessor(user_type)) for user_type in PROFILE_MODEL_MAP
+        )
+        if accessor
+    }
+
+
+def rebuild_search_tokens(user_ids):
+    """Replace the tokens of ``user_ids`` from one read, one delete and one insert."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    slug_lookups = _profile_slug_lookups()
+    slug_columns = list(dict.fromkeys(slug_lookups.values()))
+    columns = ["pk", "username", "email", "first_name", "last_name", "user_type"]
+    rows = User.objects.filter(pk__in=user_ids).values_list(*columns, *slug_columns)
+
+    tokens = []
+    for row in rows:
+        values = dict(zip(columns + slug_columns, row))
+        slug_lookup = slug_lookups.get(values["user_type"])
+        tokens.extend(
+            UserSearchToken(user_id=values["pk"], token=token)
+            for token in user_tokens(
+                values["username"],
+                values["email"],
+                values["first_name"],
+                values["last_name"],
+                values[slug_lookup] if slug_lookup else None,
+            )
+        )
+    UserSearchToken.objects.filter(user_id__in=user_ids).delete()
+    UserSearchToken.objects.bulk_create(tokens, batch_size=1000)
+    return len(tokens)
+
+
+def _match_substring(vendor, term):
+    return (
+        vendor == "postgresql"
+        and len(term) >= TRIGRAM_MIN_LENGTH
+        and getattr(settings, "USER_SEARCH_TRIGRAM", True)
+    )
+
+
+def _term_lookup(vendor, term):
+    if _match_substring(vendor, term):
+        return {"token__contains": term}
+    lookup = {"token__startswith": term}
+    if vendor not in ("postgresql", "mysql"):
+        # LIKE is not index-assisted here; the range is.
+        lookup.update(token__gte=term, token__lt=term + _RANGE_END)
+    return lookup
+
+
+def search_users(queryset, query):
+    """Filter ``queryset`` to users matching every term of ``query``."""
+    terms = [normalize(term) for term in (query or "").split()]
+    terms = list(dict.fromkeys(term[:_TOKEN_LENGTH] for term in terms if term))[:MAX_TERMS]
+    if not terms:
+        return queryset
+    vendor = connections[router.db_for_read(UserSearchToken)].vendor
+    for term in terms:
+        matches = UserSearchToken.objects.filter(**_term_lookup(vendor, term))
+        queryset = queryset.filter(pk__in=matches.values("user_id"))
+    return queryset
@@ -1,17 +1,211 @@
+import warnings
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, router
+from django.db.models import QuerySet
 from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
 
 from .models import User
 
+# Fields whose ``to_representation`` returns database values unchanged.
+_PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+)
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _is_passthrough(field):
+    if isinstance(field, serializers.ChoiceField):
+        return all(isinstance(key, str) for key in field.choices)
+    return isinstance(field, _PASSTHROUGH_FIELDS)
+
+
+def _compile(serializer, prefix=""):
+    """
+    Return ``(columns, build)``: the ``values_list`` lookups the serializer
+    needs and a function turning a row slice into its representation.
+    Raises ``_Unsupported`` for fields that need a model instance.
+    """
+    model = serializer.Meta.model
+    columns, steps = [], []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if field.source == "*" or "." in field.source:
+            raise _Unsupported(name)
+
+        if isinstance(field, ValuesSerializerMixin):
+            # The related pk comes first so a missing relation renders as None.
+            nested_prefix = f"{prefix}{field.source}__"
+            nested_columns, nested_build = _compile(field, nested_prefix)
+            start = len(columns)
+            columns.append(f"{nested_prefix}pk")
+            columns.extend(nested_columns)
+            steps.append((name, start, len(nested_columns), nested_build))
+            continue
+
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise _Unsupported(name)
+        if model_field.is_relation:
+            if not model_field.concrete or not isinstance(field, PrimaryKeyRelatedField):
+                raise _Unsupported(name)
+            if field.pk_field is not None:
+                raise _Unsupported(name)
+            columns.append(f"{prefix}{model_field.attname}")
+            steps.append((name, len(columns) - 1, None, None))
+        else:
+            columns.append(f"{prefix}{model_field.name}")
+            convert = None if _is_passthrough(field) else field.to_representation
+            steps.append((name, len(columns) - 1, None, convert))
+
+    def build(row, offset=0):
+        data = {}
+        for name, index, width, convert in steps:
+            value = row[offset + index]
+            if width is not None:
+                data[name] = None if value is None else convert(row, offset + index + 1)
+            elif value is None or convert is None:
+                data[name] = value
+            else:
+                data[name] = convert(value)
+        return data
+
+    return columns, build
+
+
+class ValuesSerializerMixin:
+    """
+    ``values_data(queryset)`` renders the same dicts as
+    ``Serializer(queryset, many=True).data`` from one ``values_list`` query,
+    skipping model instantiation and per-field ``to_representation`` calls.
+    Nested ``ValuesSerializerMixin`` serializers are joined into that query.
+
+    Serializers with fields that need a model instance (method fields, dotted
+    sources, many-related fields) fall back to the regular path.
+    """
+
+    @classmethod
+    def _values_plan(cls):
+        if "_values_plan_cache" not in cls.__dict__:
+            try:
+                cls._values_plan_cache = _compile(cls())
+            except _Unsupported:
+                cls._values_plan_cache = None
+        return cls._values_plan_cache
+
+    @classmethod
+    def values_data(cls, queryset):
+        plan = cls._values_plan()
+        if plan is None:
+            return cls(queryset, many=True).data
+        columns, build = plan
+        return [build(row) for row in queryset.values_list(*columns)]
+
+
+class NPlusOneWarning(RuntimeWarning):
+    pass
+
 
-class UserSummarySerializer(serializers.ModelSerializer):
+def _repeated_queries(statements, threshold):
+    # Parameters are not interpolated, so one lookup per row shares its SQL.
+    return [(sql, count) for sql, count in Counter(statements).items() if count > threshold]
+
+
+class EagerListSerializer(serializers.ListSerializer):
+    """
+    With ``DEBUG`` on, warns with ``NPlusOneWarning`` when serializing a
+    queryset repeats the same SQL more than
+    ``USER_SERIALIZER_N_PLUS_ONE_THRESHOLD`` times.
+    """
+
+    def to_representation(self, data):
+        if not settings.DEBUG or not isinstance(data, QuerySet):
+            return super().to_representation(data)
+
+        statements = []
+
+        def _record(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        alias = router.db_for_read(data.model)
+        with connections[alias].execute_wrapper(_record):
+            representation = super().to_representation(data)
+        threshold = getattr(settings, "USER_SERIALIZER_N_PLUS_ONE_THRESHOLD", 3)
+        for sql, count in _repeated_queries(statements, threshold):
+            warnings.warn(
+                f"{type(self.child).__name__} ran the same query {count} times; "
+                f"declare it in eager_select_related/eager_prefetch_related: {sql}",
+                NPlusOneWarning,
+                stacklevel=2,
+            )
+        return representation
+
+
+class EagerLoadingMixin:
+    """
+    Serializers declare the relations they read and apply them to the queryset
+    they are given with ``many=True``, so callers do not have to remember
+    ``select_related``::
+
+        class LeaderProfileSerializer(BaseProfileSerializer):
+            eager_select_related = BaseProfileSerializer.eager_select_related + ("organization",)
+
+            class Meta(BaseProfileSerializer.Meta):
+                model = LeaderProfile
+
+    Inherit ``Meta`` from the parent to keep ``EagerListSerializer``'s N+1 check.
+    """
+
+    eager_select_related = ()
+    eager_prefetch_related = ()
+    # Field names for only(); None loads every column.
+    eager_only = None
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if not isinstance(queryset, QuerySet):
+            return queryset
+        if cls.eager_select_related:
+            queryset = queryset.select_related(*cls.eager_select_related)
+        if cls.eager_prefetch_related:
+            queryset = queryset.prefetch_related(*cls.eager_prefetch_related)
+        if cls.eager_only is not None:
+            queryset = queryset.only(*cls.eager_only)
+        return queryset
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        if args:
+            args = (cls.setup_eager_loading(args[0]),) + args[1:]
+        elif "instance" in kwargs:
+            kwargs["instance"] = cls.setup_eager_loading(kwargs["instance"])
+        return super().many_init(*args, **kwargs)
+
+
+class UserSummarySerializer(ValuesSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ("id", "username", "first_name", "last_name", "email", "user_type")
 
 
-class BaseProfileSerializer(serializers.ModelSerializer):
+class BaseProfileSerializer(
+    EagerLoadingMixin, ValuesSerializerMixin, serializers.ModelSerializer
+):
     user = UserSummarySerializer()
 
+    eager_select_related = ("user",)
+
     class Meta:
         fields = ("id", "slug", "user")
-
+        list_serializer_class = EagerListSerializer
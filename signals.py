@@ -1,57 +1,255 @@
 # user/signals.py
 
-from django.conf import settings
-from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models.signals import post_save
+import threading
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from django.template.loader import render_to_string
-from django.urls import reverse
-from django.utils.encoding import force_bytes
-from django.utils.http import urlsafe_base64_encode
 
-from user.models import User
-from core.tasks import run_async
-from core.logging import log_event
+from user.availability import username_index
+from user.backends import INVALIDATING_FIELDS, invalidate_cached_user
+from user.counters import adjust_organization_count, move_user_counts
+from user.emails import needs_activation_email
+from user.models import PROFILE_MODEL_MAP, User, _get_profile_model, get_profile_accessor
+from user.outbox import enqueue_activation_emails
+from user.routes import invalidate_faculty_facility_slugs
+from user.search import rebuild_search_tokens
+from user.stats import adjust_user_counts
 
 
 @receiver(post_save, sender=User)
 def send_activation_email(sender, instance, created, **kwargs):
-    if not created or instance.is_active or not instance.email:
-        return
-
-    base_url = getattr(settings, "SITE_BASE_URL", "")
-    if not base_url and settings.ALLOWED_HOSTS:
-        base_url = f"https://{settings.ALLOWED_HOSTS[0]}"
-    if not base_url:
-        base_url = "http://localhost:8000"
-    base_url = base_url.rstrip("/")
-
-    uid = urlsafe_base64_encode(force_bytes(instance.pk))
-    token = default_token_generator.make_token(instance)
-    activation_link = reverse("activate", kwargs={"uidb64": uid, "token": token})
-    activation_url = f"{base_url}{activation_link}"
-
-    message = render_to_string(
-        "email/activation_email.html",
-        {
-            "user": instance,
-            "activation_url": activation_url,
-        },
-    )
+    """
+    Record the activation mail in the outbox; ``drain_email_outbox`` sends it.
+    The row joins whatever transaction the user insert is running in.
+    """
+    if not created or not needs_activation_email(instance):
+        return
 
-    def _deliver():
-        send_mail(
-            subject="Activate Your Account",
-            message=message,
-            from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-            recipient_list=[instance.email],
-            fail_silently=True,
-        )
-        log_event(
-            "email.activation.sent",
-            actor_id=getattr(instance, "id", None),
-            extra={"email": instance.email},
+    enqueue_activation_emails([instance])
+
+
+@receiver(post_save, sender=User)
+def index_username(sender, instance, created, **kwargs):
+    if created or instance.has_changed("username"):
+        username_index.add(instance.username)
+
+
+SEARCH_FIELDS = ("username", "email", "first_name", "last_name")
+
+
+@receiver(post_save, sender=User)
+def index_search_tokens(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not set(SEARCH_FIELDS) & set(update_fields):
+        return
+    if created or instance.has_changed(*SEARCH_FIELDS):
+        rebuild_search_tokens([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def track_user_counts(sender, instance, created, update_fields=None, **kwargs):
+    current = (instance.user_type, instance.is_active)
+    if created:
+        deltas = {current: 1}
+    else:
+        if update_fields is not None and not {"user_type", "is_active"} & set(update_fields):
+            return
+        previous = (
+            instance.get_previous_value("user_type"),
+            instance.get_previous_value("is_active"),
         )
+        if previous == current:
+            return
+        deltas = {previous: -1, current: 1}
+    transaction.on_commit(lambda: adjust_user_counts(deltas))
+
+
+def _loaded_profile_organizations(user, roles):
+    """``{role: organization id or None}`` when every role's profile is loaded."""
+    organizations = {}
+    for role in roles:
+        accessor = get_profile_accessor(role)
+        if accessor not in user._state.fields_cache:
+            return None
+        profile = user._state.fields_cache[accessor]
+        organizations[role] = None if profile is None else profile.organization_id
+    return organizations
+
+
+@receiver(post_save, sender=User)
+def track_organization_counts(sender, instance, created, update_fields=None, **kwargs):
+    # New users have no profile yet; the profile receivers count them.
+    if created:
+        return
+    if update_fields is not None and not {"user_type", "is_active"} & set(update_fields):
+        return
+    previous = (
+        instance.get_previous_value("user_type"),
+        instance.get_previous_value("is_active"),
+    )
+    current = (instance.user_type, instance.is_active)
+    roles = {previous[0], current[0]} & set(PROFILE_MODEL_MAP)
+    if previous == current or not roles:
+        return
+    # Inside the save's transaction so the counts roll back with it; a loaded
+    # profile saves the lookup, otherwise it is one UPDATE per affected role.
+    move_user_counts(
+        instance.pk, previous, current, _loaded_profile_organizations(instance, roles)
+    )
+
+
+@receiver(post_delete, sender=User)
+def untrack_user_counts(sender, instance, **kwargs):
+    deltas = {
+        (
+            instance.get_previous_value("user_type"),
+            instance.get_previous_value("is_active"),
+        ): -1
+    }
+    transaction.on_commit(lambda: adjust_user_counts(deltas))
+
+
+@receiver(post_save, sender=User)
+def invalidate_auth_cache(sender, instance, update_fields=None, **kwargs):
+    # last_login updates on every login do not touch the cached copy.
+    if update_fields is not None and not set(INVALIDATING_FIELDS) & set(update_fields):
+        return
+    invalidate_cached_user(instance.pk)
+    # Also after commit, in case a concurrent request re-cached the old row.
+    transaction.on_commit(lambda: invalidate_cached_user(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def drop_auth_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+    invalidate_faculty_facility_slugs([instance.pk])
+
+
+# Users being deleted by the current delete() call in this thread. Their
+# profiles are deleted first in the same cascade; the profile receivers read
+# the user's state from here and pool their counter deltas until the users go.
+_cascade = threading.local()
+
+
+def _cascading_user_state(user_id, origin):
+    if origin is None or getattr(_cascade, "origin", None) is not origin:
+        return None
+    return _cascade.users.get(user_id)
+
+
+@receiver(pre_delete, sender=User)
+def collect_deleted_user(sender, instance, origin=None, **kwargs):
+    if getattr(_cascade, "origin", None) is not origin:
+        # A new delete() call; drops whatever a failed one left behind.
+        _cascade.origin, _cascade.users, _cascade.deltas = origin, {}, Counter()
+    _cascade.users[instance.pk] = (
+        instance.get_previous_value("user_type"),
+        instance.get_previous_value("is_active"),
+    )
+
+
+@receiver(post_delete, sender=User)
+def release_deleted_user(sender, instance, origin=None, **kwargs):
+    if getattr(_cascade, "origin", None) is not origin:
+        return
+    _cascade.users.pop(instance.pk, None)
+    deltas, _cascade.deltas = _cascade.deltas, Counter()
+    for (organization_id, role, active), delta in deltas.items():
+        adjust_organization_count(organization_id, role, active, delta)
+    if not _cascade.users:
+        _cascade.origin = None
+
+
+def _invalidate_facility_slugs(user_ids):
+    user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id is not None]
+    if not user_ids:
+        return
+    invalidate_faculty_facility_slugs(user_ids)
+    # Also after commit, in case a concurrent request re-cached the old row.
+    transaction.on_commit(lambda: invalidate_faculty_facility_slugs(user_ids))
+
+
+def faculty_profile_changed(sender, instance, **kwargs):
+    # A profile handed to another user leaves the previous owner's entry stale.
+    previous_user_id = getattr(instance, "_loaded_user_id", None)
+    _invalidate_facility_slugs([instance.user_id, previous_user_id])
+
+
+def facility_changed(sender, instance, **kwargs):
+    user_ids = _FacultyProfile.objects.filter(facility=instance).values_list(
+        "user_id", flat=True
+    )
+    _invalidate_facility_slugs(list(user_ids))
+
+
+def profile_slug_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "slug" not in update_fields:
+        return
+    rebuild_search_tokens([instance.user_id])
+
+
+def profile_deleted(sender, instance, origin=None, **kwargs):
+    if _cascading_user_state(instance.user_id, origin) is not None:
+        # The user's tokens are deleted with it.
+        return
+    # Rebuilt rather than dropping the slug's token, which the username may share.
+    rebuild_search_tokens([instance.user_id])
+
+
+def _profile_user_state(profile):
+    """``(user_type, is_active)`` of the profile's user as stored in the DB."""
+    state = getattr(profile, "_user_state", None)
+    if state is not None:
+        return state
+    user = profile._state.fields_cache.get("user")
+    if user is not None and getattr(user, "_loaded_values", None) is not None:
+        # Values as of the user's last load or save, unsaved edits aside.
+        return user.get_previous_value("user_type"), user.get_previous_value("is_active")
+    return (
+        User.objects.filter(pk=profile.user_id).values_list("user_type", "is_active").first()
+    )
+
+
+def profile_counts_changed(sender, instance, created, **kwargs):
+    role = _PROFILE_ROLES[sender]
+    previous_organization = getattr(instance, "_loaded_organization_id", None)
+    if not created and previous_organization in (None, instance.organization_id):
+        return
+    state = _profile_user_state(instance)
+    if state is None or state[0] != role:
+        return
+    if not created:
+        adjust_organization_count(previous_organization, role, state[1], -1)
+    adjust_organization_count(instance.organization_id, role, state[1], 1)
+
+
+def profile_counts_deleted(sender, instance, origin=None, **kwargs):
+    role = _PROFILE_ROLES[sender]
+    state = _cascading_user_state(instance.user_id, origin)
+    if state is not None:
+        if state[0] == role:
+            _cascade.deltas[(instance.organization_id, role, state[1])] -= 1
+        return
+    state = _profile_user_state(instance)
+    if state is not None and state[0] == role:
+        adjust_organization_count(instance.organization_id, role, state[1], -1)
+
+
+# Signals are imported from AppConfig.ready(), so the registry is populated.
+_PROFILE_ROLES = {}
+for _user_type in PROFILE_MODEL_MAP:
+    _profile_model = _get_profile_model(_user_type)
+    _PROFILE_ROLES[_profile_model] = _user_type
+    post_save.connect(profile_slug_changed, sender=_profile_model)
+    post_delete.connect(profile_deleted, sender=_profile_model)
+    post_save.connect(profile_counts_changed, sender=_profile_model)
+    post_delete.connect(profile_counts_deleted, sender=_profile_model)
 
-    run_async(_deliver)
+_FacultyProfile = _get_profile_model(User.UserType.FACULTY)
+post_save.connect(faculty_profile_changed, sender=_FacultyProfile)
+post_delete.connect(faculty_profile_changed, sender=_FacultyProfile)
+_Facility = _FacultyProfile._meta.get_field("facility").related_model
+post_save.connect(facility_changed, sender=_Facility)
+# Before the delete, while the profiles still point at the facility.
+pre_delete.connect(facility_changed, sender=_Facility)
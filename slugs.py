@@ -0,0 +1,210 @@
+# user/slugs.py
+"""
+Unique slug allocation for ``BaseUserProfile`` subclasses.
+
+Each (profile table, base slug) pair owns a row in ``ProfileSlugCounter``
+holding the last numeric suffix handed out, so "john-smith" is followed by
+"john-smith-1", "john-smith-2", ... without probing candidates one query at a
+time. A counter is seeded from a single ``LIKE 'base-%'`` scan the first time
+its base is seen; afterwards allocations touch the counter rows, which are
+locked for the rest of the surrounding transaction so concurrent
+registrations of the same name serialize instead of colliding, plus one
+existence check of the candidates against slugs handed out for other bases.
+That check cannot see a concurrent transaction drawing the same slug from
+another base, so ``BaseUserProfile.save()`` retries such an insert with the
+next suffix.
+
+``resync_profile_slugs`` reuses the allocator to repair whole tables in bulk.
+"""
+
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+SLUG_MAX_LENGTH = 255
+# Room left for "-<suffix>" when truncating long bases.
+SUFFIX_RESERVE = 11
+DEFAULT_BASE = "user"
+# Keep OR-ed lookups well below SQLite's expression depth limit.
+LOOKUP_BATCH = 200
+# Candidates per existence check; below SQLite's 999 parameter limit.
+CHECK_BATCH = 500
+MAX_ATTEMPTS = 3
+
+
+def normalize_base(base):
+    base = (base or DEFAULT_BASE)[: SLUG_MAX_LENGTH - SUFFIX_RESERVE].strip("-")
+    return base or DEFAULT_BASE
+
+
+def format_slug(base, suffix):
+    return base if suffix == 0 else f"{base}-{suffix}"
+
+
+def slug_matches_base(slug, base):
+    """True when ``slug`` is ``base`` itself or ``base`` plus a numeric suffix."""
+    base = normalize_base(base)
+    return slug == base or re.fullmatch(rf"{re.escape(base)}-\d+", slug or "") is not None
+
+
+def _scope(model):
+    return model._meta.label_lower
+
+
+def _seed_suffixes(model, bases):
+    """
+    Return ``{base: last used suffix or None}`` from the rows already in
+    ``model``; ``None`` means the base is free.
+    """
+    seeds = dict.fromkeys(bases)
+    for start in range(0, len(bases), LOOKUP_BATCH):
+        batch = bases[start : start + LOOKUP_BATCH]
+        lookup = reduce(
+            or_, (Q(slug=base) | Q(slug__startswith=f"{base}-") for base in batch)
+        )
+        patterns = {base: re.compile(rf"^{re.escape(base)}(?:-(\d+))?$") for base in batch}
+        for slug in model.objects.filter(lookup).values_list("slug", flat=True):
+            for base, pattern in patterns.items():
+                match = pattern.match(slug)
+                if match:
+                    suffix = int(match.group(1) or 0)
+                    seeds[base] = max(seeds[base] or 0, suffix)
+    return seeds
+
+
+def _assign(bases, first_suffix, taken):
+    """Hand out suffixes per base in order, skipping slugs in ``taken``."""
+    next_suffix = dict(first_suffix)
+    slugs, seen = [], set()
+    for base in bases:
+        slug = format_slug(base, next_suffix[base])
+        next_suffix[base] += 1
+        while slug in taken or slug in seen:
+            slug = format_slug(base, next_suffix[base])
+            next_suffix[base] += 1
+        seen.add(slug)
+        slugs.append(slug)
+    return slugs, next_suffix
+
+
+def _existing_slugs(model, slugs):
+    slugs = sorted(set(slugs))
+    existing = set()
+    for start in range(0, len(slugs), CHECK_BATCH):
+        batch = slugs[start : start + CHECK_BATCH]
+        existing.update(model.objects.filter(slug__in=batch).values_list("slug", flat=True))
+    return existing
+
+
+def _allocate(model, bases):
+    from user.models import ProfileSlugCounter
+
+    scope = _scope(model)
+    counters = {
+        counter.base: counter
+        for counter in ProfileSlugCounter.objects.select_for_update().filter(
+            scope=scope, base__in=list(dict.fromkeys(bases))
+        )
+    }
+    first_suffix = {base: counter.last_suffix + 1 for base, counter in counters.items()}
+    missing = [base for base in dict.fromkeys(bases) if base not in counters]
+    if missing:
+        for base, seed in _seed_suffixes(model, missing).items():
+            first_suffix[base] = 0 if seed is None else seed + 1
+
+    # Counters are per base, so "john-smith" + "-1" can meet a row whose base
+    # was "john-smith-1"; skip candidates that already exist until none do.
+    taken = set()
+    while True:
+        slugs, next_suffix = _assign(bases, first_suffix, taken)
+        clashes = _existing_slugs(model, slugs)
+        if not clashes:
+            break
+        taken |= clashes
+
+    for base, counter in counters.items():
+        counter.last_suffix = next_suffix[base] - 1
+    if counters:
+        ProfileSlugCounter.objects.bulk_update(counters.values(), ["last_suffix"])
+    if missing:
+        # Raises IntegrityError if another transaction seeded the same base.
+        ProfileSlugCounter.objects.bulk_create(
+            [
+                ProfileSlugCounter(scope=scope, base=base, last_suffix=next_suffix[base] - 1)
+                for base in missing
+            ]
+        )
+    return slugs
+
+
+def allocate_slugs(model, bases):
+    """
+    Return one unique slug per entry of ``bases`` (order kept, repeats
+    allowed) for rows of ``model``. Costs a constant number of queries per
+    call; the counters stay locked until the caller's transaction ends.
+    """
+    bases = [normalize_base(base) for base in bases]
+    if not bases:
+        return []
+
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return _allocate(model, bases)
+        except IntegrityError:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+    return []
+
+
+def allocate_slug(model, base):
+    return allocate_slugs(model, [base])[0]
+
+
+def resync_profile_slugs(model, chunk_size=1000, dry_run=False, progress=None):
+    """
+    Walk ``model`` in primary-key order and give every profile whose slug no
+    longer matches ``generate_slug()`` a fresh one: one read, one allocation
+    and one ``bulk_update`` per chunk. Returns ``{"scanned", "changed"}``;
+    ``progress`` is called with that dict after each chunk.
+    """
+    from user.search import rebuild_search_tokens
+
+    totals = {"scanned": 0, "changed": 0}
+    last_pk = None
+    queryset = (
+        model.objects.select_related("user")
+        .only("pk", "slug", "user", "user__username", "user__first_name", "user__last_name")
+        .order_by("pk")
+    )
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        profiles = list(chunk[:chunk_size])
+        if not profiles:
+            break
+        last_pk = profiles[-1].pk
+
+        stale = []
+        bases = []
+        for profile in profiles:
+            base = profile.generate_slug()
+            if not slug_matches_base(profile.slug, base):
+                stale.append(profile)
+                bases.append(base)
+
+        if stale and not dry_run:
+            with transaction.atomic():
+                for profile, slug in zip(stale, allocate_slugs(model, bases)):
+                    profile.slug = slug
+                model.objects.bulk_update(stale, ["slug"])
+                # bulk_update bypasses the receivers that index profile slugs.
+                rebuild_search_tokens([profile.user_id for profile in stale])
+
+        totals["scanned"] += len(profiles)
+        totals["changed"] += len(stale)
+        if progress is not None:
+            progress(dict(totals))
+    return totals
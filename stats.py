@@ -0,0 +1,88 @@
+# user/stats.py
+"""
+Cached per-role and active/inactive user counts.
+
+Every (user_type, is_active) bucket lives under its own cache key so the
+``User`` save/delete receivers can adjust it with an atomic ``incr``. The
+buckets are rebuilt from one aggregate query when any of them is missing, and
+expire after ``USER_COUNTS_TIMEOUT`` so drift from queryset ``update()`` calls
+repairs itself.
+"""
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import User
+
+USER_COUNTS_TIMEOUT = 60 * 60
+_KEY_PREFIX = "user:counts"
+_BUILT_KEY = f"{_KEY_PREFIX}:built"
+
+
+def _roles():
+    return list(User.UserType.values) + [""]
+
+
+def _bucket_key(role, active):
+    return f"{_KEY_PREFIX}:{role or '-'}:{int(bool(active))}"
+
+
+def _all_keys():
+    return [_bucket_key(role, active) for role in _roles() for active in (True, False)]
+
+
+def rebuild_user_counts():
+    buckets = dict.fromkeys(_all_keys(), 0)
+    rows = User.objects.order_by().values("user_type", "is_active").annotate(total=Count("id"))
+    for row in rows:
+        key = _bucket_key(row["user_type"], row["is_active"])
+        buckets[key] = buckets.get(key, 0) + row["total"]
+    buckets[_BUILT_KEY] = True
+    cache.set_many(buckets, USER_COUNTS_TIMEOUT)
+    return buckets
+
+
+def invalidate_user_counts():
+    cache.delete(_BUILT_KEY)
+
+
+def adjust_user_counts(deltas):
+    """Apply ``{(user_type, is_active): delta}`` to the cached buckets."""
+    for (role, active), delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            cache.incr(_bucket_key(role, active), delta)
+        except ValueError:
+            # Bucket not cached; the next read rebuilds everything.
+            invalidate_user_counts()
+            return
+
+
+def get_user_counts():
+    """
+    Return ``{"total", "active", "inactive", "by_role": {role: {"active",
+    "inactive", "total"}}}`` from the cache, rebuilding it if needed.
+    """
+    keys = _all_keys()
+    cached = cache.get_many(keys + [_BUILT_KEY])
+    if not cached.get(_BUILT_KEY) or any(key not in cached for key in keys):
+        cached = rebuild_user_counts()
+
+    labels = dict(User.UserType.choices)
+    counts = {"total": 0, "active": 0, "inactive": 0, "by_role": {}}
+    for role in _roles():
+        active = max(cached[_bucket_key(role, True)], 0)
+        inactive = max(cached[_bucket_key(role, False)], 0)
+        if not role and not (active or inactive):
+            continue
+        counts["by_role"][role] = {
+            "label": labels.get(role, "Unassigned"),
+            "active": active,
+            "inactive": inactive,
+            "total": active + inactive,
+        }
+        counts["active"] += active
+        counts["inactive"] += inactive
+    counts["total"] = counts["active"] + counts["inactive"]
+    return counts
@@ -1,13 +1,74 @@
+import csv
+import io
+import itertools
+import os
+import re
+import subprocess
+import sys
+import threading
+import uuid
+import warnings
 from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from html import unescape
+from unittest import mock
 
-from django.db.models.signals import post_save
-from django.test import TestCase
+from django import forms
+from django.apps import apps
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail import EmailMessage, get_connection
+from django.core.management import call_command
+from django.db import connection, models, transaction
+from django.db.models import Count, DateTimeField
+from django.db.models.functions import Lower
+from django.db.models.signals import post_save, pre_delete
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.contrib.auth.models import update_last_login
 from django.contrib.auth.tokens import default_token_generator
+from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
+from rest_framework import serializers
 
-from user.models import User, ensure_profile as ensure_profile_signal
+from user.availability import BloomFilter, username_index
+from user.backends import CachedModelBackend, get_auth_cache_stats, reset_auth_cache_stats
+from user.counters import (
+    adjust_organization_count,
+    get_organization_counts,
+    get_organization_role_count,
+)
+from user.emails import build_activation_message, render_activation_bodies
+from user.export import ExportFilterError, export_rows, filter_users, stream_csv
+from user.forms import find_user_conflicts
+from user.importer import import_users, read_csv_rows
+from user.mail import MailWorker
+from user.models import (
+    EmailOutbox,
+    User,
+    UserSearchToken,
+    _get_profile_model,
+    ensure_profile as ensure_profile_signal,
+    get_enrollment_date_fields,
+)
+from user.outbox import drain_outbox
+from user.pagination import KeysetPaginator
+from user.routes import get_faculty_facility_slug
+from user.search import rebuild_search_tokens, search_users, user_tokens
+from user.serializers import (
+    BaseProfileSerializer,
+    EagerListSerializer,
+    EagerLoadingMixin,
+    NPlusOneWarning,
+    UserSummarySerializer,
+)
+from user.slugs import allocate_slug, allocate_slugs, slug_matches_base
+from user.stats import get_user_counts
+from user.views import AdminUserListView, DashboardView, RegisterView
 
 
 class UserModelTests(TestCase):
@@ -21,6 +82,45 @@ class UserModelTests(TestCase):
         )
         self.assertEqual(user.get_full_name(), "Full Name")
 
+    def test_dirty_fields_track_changes_since_load(self):
+        user = User.objects.create_user(
+            username="dirty.check",
+            password="testpass123",
+            user_type=User.UserType.ADMIN,
+        )
+        user = User.objects.get(pk=user.pk)
+        self.assertEqual(user.get_dirty_fields(), set())
+
+        user.first_name = "Changed"
+        user.is_active = False
+        self.assertEqual(user.get_dirty_fields(), {"first_name", "is_active"})
+        self.assertTrue(user.has_changed("first_name", "username"))
+
+        user.save()
+        self.assertEqual(user.get_dirty_fields(), set())
+
+
+class EnsureProfileQueryTests(TestCase):
+    def setUp(self):
+        with mute_profile_signals():
+            self.user = User.objects.create_user(
+                username="leader.login",
+                password="pass1234",
+                user_type=User.UserType.LEADER,
+            )
+        self.user = User.objects.get(pk=self.user.pk)
+
+    def test_login_adds_no_profile_queries(self):
+        # Only the UPDATE of last_login itself.
+        with self.assertNumQueries(1):
+            update_last_login(None, self.user)
+
+    def test_saving_non_identity_field_skips_profile_sync(self):
+        self.user.is_active = False
+        # The user UPDATE and the organization count move; no profile sync.
+        with self.assertNumQueries(2):
+            self.user.save()
+
 
 @contextmanager
 def mute_profile_signals():
@@ -34,8 +134,93 @@ def mute_profile_signals():
             post_save.connect(receiver, sender=User)
 
 
-class DashboardRouteTests(TestCase):
+_fixture_numbers = itertools.count(1)
+
+
+def create_fixture_row(model, **values):
+    """
+    Save a real ``model`` row, filling every required field left out of
+    ``values``. The organization, facility and enrollment models live in
+    sibling apps, so their required columns are read from ``_meta``;
+    required foreign keys get a row of their own the same way.
+    """
+    number = next(_fixture_numbers)
+    for field in model._meta.concrete_fields:
+        if (
+            field.name in values
+            or field.attname in values
+            or field.primary_key
+            or field.null
+            or field.has_default()
+            or getattr(field, "auto_now", False)
+            or getattr(field, "auto_now_add", False)
+        ):
+            continue
+        values[field.name] = _fixture_value(model, field, number)
+    return model.objects.create(**values)
+
+
+def _fixture_value(model, field, number):
+    if field.is_relation:
+        if field.related_model is User:
+            with mute_profile_signals():
+                return User.objects.create_user(
+                    username=f"fixture.{number}", password="pass1234"
+                )
+        return create_fixture_row(field.related_model)
+    if field.choices:
+        return field.flatchoices[0][0]
+    if isinstance(field, models.BooleanField):
+        return False
+    if isinstance(field, models.DateTimeField):
+        return timezone.now()
+    if isinstance(field, models.DateField):
+        return timezone.localdate()
+    if isinstance(field, models.TimeField):
+        return time()
+    if isinstance(field, models.DurationField):
+        return timedelta()
+    if isinstance(field, (models.IntegerField, models.FloatField, models.DecimalField)):
+        return number
+    if isinstance(field, models.UUIDField):
+        return uuid.uuid4()
+    if isinstance(field, models.JSONField):
+        return {}
+    if isinstance(field, models.EmailField):
+        return f"fixture.{number}@example.com"
+    if isinstance(field, models.URLField):
+        return f"https://example.com/{number}"
+    if isinstance(field, (models.CharField, models.TextField)):
+        value = f"{model._meta.model_name}-{number}"
+        # Keep the number, which is what makes the value unique.
+        return value[-field.max_length:] if field.max_length else value
+    raise NotImplementedError(f"No fixture value for {model.__name__}.{field.name}.")
+
+
+class OrganizationFixtureMixin:
+    """A real organization, and a facility inside it, for profile rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        faculty_model = _get_profile_model(User.UserType.FACULTY)
+        organization_model = faculty_model._meta.get_field("organization").related_model
+        facility_model = faculty_model._meta.get_field("facility").related_model
+        cls.organization = create_fixture_row(organization_model)
+        cls.facility = create_fixture_row(
+            facility_model,
+            **{
+                field.name: cls.organization
+                for field in facility_model._meta.concrete_fields
+                if field.is_relation and field.related_model is organization_model
+            },
+        )
+
+
+class DashboardRouteTests(OrganizationFixtureMixin, TestCase):
     def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
         self.dashboard_url = reverse("dashboard")
 
     def test_requires_login(self):
@@ -89,6 +274,61 @@ class DashboardRouteTests(TestCase):
             fetch_redirect_response=False,
         )
 
+    def test_redirect_lookup_query_budget(self):
+        with mute_profile_signals():
+            leader = User.objects.create_user(
+                username="leader.budget", password="pass1234", user_type=User.UserType.LEADER
+            )
+            faculty = User.objects.create_user(
+                username="faculty.budget", password="pass1234", user_type=User.UserType.FACULTY
+            )
+        view = DashboardView()
+        view.get_dashboard_redirect_url(leader)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                view.get_dashboard_redirect_url(leader), reverse("leaders:dashboard")
+            )
+        with self.assertNumQueries(1):
+            self.assertIsNone(view.get_dashboard_redirect_url(faculty))
+        with self.assertNumQueries(0):
+            self.assertIsNone(view.get_dashboard_redirect_url(faculty))
+
+    def test_facility_delete_and_profile_handover_drop_cached_slugs(self):
+        model = _get_profile_model(User.UserType.FACULTY)
+        facility_model = model._meta.get_field("facility").related_model
+        with mute_profile_signals():
+            first, second = (
+                User.objects.create_user(
+                    username=f"faculty.{name}", password="pass1234", user_type=User.UserType.FACULTY
+                )
+                for name in ("first", "second")
+            )
+        (profile,) = model.objects.bulk_create(
+            [
+                model(
+                    user=first,
+                    organization=self.organization,
+                    facility=self.facility,
+                    slug="faculty-first",
+                )
+            ]
+        )
+
+        get_faculty_facility_slug(first)
+        with self.captureOnCommitCallbacks(execute=True):
+            pre_delete.send(sender=facility_model, instance=self.facility)
+        with self.assertNumQueries(1):
+            get_faculty_facility_slug(first)
+
+        get_faculty_facility_slug(second)
+        profile = model.objects.get(pk=profile.pk)
+        profile.user = second
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        for user in (first, second):
+            with self.assertNumQueries(1):
+                get_faculty_facility_slug(user)
+
     def test_admin_without_superuser_redirects_to_admin_dashboard(self):
         with mute_profile_signals():
             admin_user = User.objects.create_user(
@@ -179,3 +419,1234 @@ class ActivateUserTests(TestCase):
         )
         self.user.refresh_from_db()
         self.assertFalse(self.user.is_active)
+
+
+class ImportUsersTests(TestCase):
+    def test_bulk_import_skips_signals_and_duplicates(self):
+        User.objects.create_user(username="taken", password="pass1234", user_type=User.UserType.OTHER)
+        fired = []
+
+        def _record(sender, instance, **kwargs):
+            fired.append(instance.username)
+
+        post_save.connect(_record, sender=User)
+        self.addCleanup(post_save.disconnect, _record, sender=User)
+
+        roster = io.StringIO(
+            "Username,Email,First_Name,Last_Name,User_Type\n"
+            "new.one,one@example.com,New,One,other\n"
+            "taken,taken@example.com,Taken,User,other\n"
+            "new.two,two@example.com,New,Two,admin\n"
+            "new.two,dup@example.com,New,Dup,admin\n"
+        )
+        result = import_users(read_csv_rows(roster), chunk_size=2, active=True)
+
+        self.assertEqual(result.rows, 4)
+        self.assertEqual(result.created, 2)
+        self.assertEqual([name for name, _ in result.skipped], ["taken", "new.two"])
+        self.assertEqual(fired, [])
+        new_two = User.objects.get(username="new.two")
+        self.assertEqual(new_two.user_type, User.UserType.ADMIN)
+        self.assertFalse(new_two.has_usable_password())
+
+
+class PurgeUnactivatedUsersTests(OrganizationFixtureMixin, TestCase):
+    def setUp(self):
+        old = timezone.now() - timedelta(days=60)
+        with mute_profile_signals():
+            for index in range(5):
+                User.objects.create_user(
+                    username=f"stale.{index}",
+                    password="pass1234",
+                    user_type=User.UserType.OTHER,
+                    is_active=False,
+                    date_joined=old,
+                )
+            User.objects.create_user(
+                username="recent", password="pass1234", is_active=False
+            )
+            User.objects.create_user(
+                username="activated", password="pass1234", date_joined=old
+            )
+
+    def _purge(self, *args, batch_size=2):
+        out = io.StringIO()
+        call_command(
+            "purge_unactivated_users",
+            "--batch-size",
+            str(batch_size),
+            "--sleep",
+            "0",
+            *args,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def _add_stale_profiles(self, prefix, count):
+        old = timezone.now() - timedelta(days=60)
+        users = []
+        for index in range(count):
+            user_type = (User.UserType.LEADER, User.UserType.ATTENDEE)[index % 2]
+            with mute_profile_signals():
+                user = User.objects.create_user(
+                    username=f"{prefix}.{index}",
+                    password="pass1234",
+                    user_type=user_type,
+                    is_active=False,
+                    date_joined=old,
+                )
+            _get_profile_model(user_type).objects.create(
+                user=user, organization=self.organization, slug=f"{prefix}-{index}"
+            )
+            users.append(user)
+        return users
+
+    def test_dry_run_deletes_nothing(self):
+        self.assertIn("5 unactivated users would be deleted", self._purge("--dry-run"))
+        self.assertEqual(User.objects.count(), 7)
+
+    def test_purges_only_stale_unactivated_accounts(self):
+        self.assertIn("5 unactivated users deleted", self._purge())
+        self.assertEqual(
+            sorted(User.objects.values_list("username", flat=True)), ["activated", "recent"]
+        )
+
+    def test_purges_role_profiles_and_their_counts(self):
+        users = self._add_stale_profiles("profiled", 4)
+        counts = get_organization_counts(self.organization.pk)
+        self.assertEqual(counts["inactive"], 4)
+
+        self.assertIn("9 unactivated users deleted (4 profiles)", self._purge())
+        for user_type in (User.UserType.LEADER, User.UserType.ATTENDEE):
+            self.assertFalse(
+                _get_profile_model(user_type).objects.filter(user__in=users).exists()
+            )
+        self.assertFalse(UserSearchToken.objects.filter(user__in=users).exists())
+        self.assertEqual(get_organization_counts(self.organization.pk)["total"], 0)
+
+    def test_batch_queries_do_not_grow_with_profiles(self):
+        self._add_stale_profiles("small", 2)
+        with CaptureQueriesContext(connection) as small:
+            self._purge(batch_size=100)
+        self._add_stale_profiles("large", 8)
+        with CaptureQueriesContext(connection) as large:
+            self.assertIn("8 unactivated users deleted (8 profiles)", self._purge(batch_size=100))
+        self.assertEqual(len(large), len(small))
+
+
+class SlugAllocatorTests(OrganizationFixtureMixin, TestCase):
+    def setUp(self):
+        self.model = _get_profile_model(User.UserType.ATTENDEE)
+
+    def test_same_name_slugs_are_unique_in_constant_queries(self):
+        with CaptureQueriesContext(connection) as first:
+            slugs = allocate_slugs(self.model, ["john-smith"] * 1000)
+        self.assertEqual(len(set(slugs)), 1000)
+        self.assertEqual(slugs[:3], ["john-smith", "john-smith-1", "john-smith-2"])
+        # Counter read, seed scan, two candidate checks, counter insert, savepoint.
+        self.assertLessEqual(len(first), 7)
+
+        with CaptureQueriesContext(connection) as second:
+            self.assertEqual(allocate_slugs(self.model, ["john-smith"]), ["john-smith-1000"])
+        self.assertLessEqual(len(second), 5)
+
+    def test_suffixed_slugs_skip_slugs_of_other_bases(self):
+        self.assertEqual(
+            allocate_slugs(self.model, ["john-smith-1", "john-smith", "john-smith"]),
+            ["john-smith-1", "john-smith", "john-smith-2"],
+        )
+
+        with mute_profile_signals():
+            user = User.objects.create_user(
+                username="jane.doe", password="pass1234", user_type=User.UserType.ATTENDEE
+            )
+        self.assertEqual(allocate_slugs(self.model, ["jane-doe"]), ["jane-doe"])
+        # A row from the "jane-doe-1" base lands on the next "jane-doe" suffix.
+        self.model.objects.bulk_create(
+            [self.model(user=user, organization=self.organization, slug="jane-doe-1")]
+        )
+        self.assertEqual(allocate_slugs(self.model, ["jane-doe"]), ["jane-doe-2"])
+        self.assertEqual(allocate_slugs(self.model, ["jane-doe"]), ["jane-doe-3"])
+
+    def test_profile_save_retries_a_slug_taken_concurrently(self):
+        with mute_profile_signals():
+            rival, user = (
+                User.objects.create_user(
+                    username=username,
+                    first_name="John",
+                    last_name="Smith",
+                    password="pass1234",
+                    user_type=User.UserType.ATTENDEE,
+                )
+                for username in ("john.rival", "john.smith")
+            )
+
+        def allocate_and_lose_the_race(model, base):
+            slug = allocate_slug(model, base)
+            if not model.objects.exists():
+                # Another transaction drew the same slug from a different base.
+                model.objects.bulk_create(
+                    [model(user=rival, organization=self.organization, slug=slug)]
+                )
+            return slug
+
+        with mock.patch("user.models.allocate_slug", side_effect=allocate_and_lose_the_race):
+            profile = self.model(user=user, organization=self.organization)
+            profile.save()
+        self.assertEqual(profile.slug, "john-smith-1")
+        self.assertEqual(
+            sorted(self.model.objects.values_list("slug", flat=True)),
+            ["john-smith", "john-smith-1"],
+        )
+
+    def test_resync_command_reports_every_profile_table(self):
+        out = io.StringIO()
+        call_command("resync_profile_slugs", "--dry-run", stdout=out)
+        output = out.getvalue()
+        for user_type in (User.UserType.FACULTY, User.UserType.ATTENDEE, User.UserType.LEADER):
+            self.assertIn(str(user_type), output)
+        self.assertIn("0 profiles scanned, 0 would change", output)
+
+    def test_resync_command_fixes_stale_and_colliding_slugs(self):
+        with mute_profile_signals():
+            users = [
+                User.objects.create_user(
+                    username=f"resync.{index}",
+                    first_name=first_name,
+                    last_name=last_name,
+                    password="pass1234",
+                    user_type=User.UserType.ATTENDEE,
+                )
+                for index, (first_name, last_name) in enumerate(
+                    [("John", "Smith"), ("John", "Smith"), ("Ada", "Lovelace")]
+                )
+            ]
+        # bulk_create keeps these slugs as given.
+        self.model.objects.bulk_create(
+            [
+                self.model(user=user, organization=self.organization, slug=slug)
+                for user, slug in zip(users, ["john-smith", "stale-one", "stale-two"])
+            ]
+        )
+        rebuild_search_tokens([user.pk for user in users])
+
+        out = io.StringIO()
+        call_command("resync_profile_slugs", "--role", User.UserType.ATTENDEE, stdout=out)
+        self.assertIn("3 profiles scanned, 2 changed", out.getvalue())
+        self.assertEqual(
+            dict(self.model.objects.values_list("user__username", "slug")),
+            {"resync.0": "john-smith", "resync.1": "john-smith-1", "resync.2": "ada-lovelace"},
+        )
+        tokens = set(
+            UserSearchToken.objects.filter(user=users[1]).values_list("token", flat=True)
+        )
+        self.assertIn("john-smith-1", tokens)
+        self.assertNotIn("stale-one", tokens)
+        self.assertEqual(
+            [user.username for user in search_users(User.objects.all(), "ada-love")],
+            ["resync.2"],
+        )
+
+    def test_slug_matches_base(self):
+        self.assertTrue(slug_matches_base("john-smith", "john-smith"))
+        self.assertTrue(slug_matches_base("john-smith-12", "john-smith"))
+        self.assertFalse(slug_matches_base("john-smith-jr", "john-smith"))
+
+
+class WithProfilesTests(TestCase):
+    def _create_users(self, prefix, count):
+        with mute_profile_signals():
+            for index in range(count):
+                User.objects.create_user(
+                    username=f"{prefix}.{index}",
+                    password="pass1234",
+                    user_type=User.UserType.LEADER,
+                )
+
+    def test_get_profile_uses_preloaded_profiles(self):
+        self._create_users("preload", 5)
+        with self.assertNumQueries(1):
+            profiles = [user.get_profile() for user in User.objects.with_profiles()]
+        self.assertEqual(profiles, [None] * 5)
+
+    def test_admin_user_list_query_count_is_constant(self):
+        with mute_profile_signals():
+            admin_user = User.objects.create_user(
+                username="admin.list",
+                password="pass1234",
+                user_type=User.UserType.ADMIN,
+                is_admin=True,
+            )
+        self.client.force_login(admin_user)
+        url = reverse("admin_user_list")
+
+        self._create_users("small", 4)
+        with CaptureQueriesContext(connection) as small_page:
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        self._create_users("full", 20)
+        with CaptureQueriesContext(connection) as full_page:
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.assertEqual(len(full_page), len(small_page))
+
+    def test_roster_rows_are_narrow_and_joined_once(self):
+        self._create_users("roster", 3)
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(User.objects.order_by("username").roster(User.UserType.LEADER))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("password", queries[0]["sql"])
+        self.assertEqual([row.username for row in rows], ["roster.0", "roster.1", "roster.2"])
+        self.assertEqual(rows[0].user_type, User.UserType.LEADER)
+        self.assertIsNone(rows[0].profile_slug)
+        self.assertFalse(hasattr(rows[0], "__dict__"))
+
+    def test_roster_filters_by_role(self):
+        self._create_users("leader", 2)
+        with mute_profile_signals():
+            User.objects.create_user(
+                username="bystander", password="pass1234", user_type=User.UserType.OTHER
+            )
+        leaders = User.objects.roster(User.UserType.LEADER)
+        self.assertEqual(sorted(row.username for row in leaders), ["leader.0", "leader.1"])
+        self.assertEqual(len(list(User.objects.roster())), 3)
+
+    def test_enrollment_stats_are_annotated_in_one_query(self):
+        self._create_users("stats", 3)
+        with self.assertNumQueries(1):
+            users = list(User.objects.with_enrollment_stats())
+        self.assertEqual(len(users), 3)
+        for user in users:
+            self.assertEqual(user.enrollment_count, 0)
+            self.assertEqual(user.active_enrollment_count, 0)
+            self.assertIsNone(user.latest_enrollment_date)
+
+    def _create_enrollment(self, user, start, end=None):
+        start_field, end_field = get_enrollment_date_fields()
+        values = {"user": user}
+        for field, day in ((start_field, start), (end_field, end)):
+            if field is None:
+                continue
+            if isinstance(field, DateTimeField):
+                day = timezone.make_aware(datetime.combine(day, time()))
+            values[field.name] = day
+        return create_fixture_row(apps.get_model("enrollment", "Enrollment"), **values)
+
+    def test_enrollment_stats_count_real_rows(self):
+        self._create_users("rows", 2)
+        busy, idle = User.objects.order_by("username")
+        today = timezone.localdate()
+        _start, end_field = get_enrollment_date_fields()
+        self._create_enrollment(busy, today - timedelta(days=30), today + timedelta(days=30))
+        self._create_enrollment(busy, today + timedelta(days=7), today + timedelta(days=60))
+        if end_field is not None:
+            self._create_enrollment(busy, today - timedelta(days=90), today - timedelta(days=60))
+
+        with self.assertNumQueries(1):
+            stats = {user.username: user for user in User.objects.with_enrollment_stats()}
+        self.assertEqual(stats["rows.0"].enrollment_count, 3 if end_field else 2)
+        self.assertEqual(stats["rows.0"].active_enrollment_count, 1)
+        latest = stats["rows.0"].latest_enrollment_date
+        if isinstance(latest, datetime):
+            latest = timezone.localtime(latest).date()
+        self.assertEqual(latest, today + timedelta(days=7))
+        self.assertEqual(stats["rows.1"].enrollment_count, 0)
+
+    def test_enrollment_date_fields_must_exist(self):
+        get_enrollment_date_fields.cache_clear()
+        self.addCleanup(get_enrollment_date_fields.cache_clear)
+        with override_settings(USER_ENROLLMENT_START_FIELD="no_such_field"):
+            with self.assertRaises(ImproperlyConfigured):
+                get_enrollment_date_fields()
+
+    def test_get_enrollments_reuses_prefetch(self):
+        self._create_users("prefetch", 3)
+        with self.assertNumQueries(2):
+            enrollments = [
+                list(user.get_enrollments()) for user in User.objects.with_enrollments()
+            ]
+        self.assertEqual(enrollments, [[], [], []])
+
+
+class ValuesSerializerTests(TestCase):
+    def setUp(self):
+        with mute_profile_signals():
+            for index, user_type in enumerate(User.UserType.values):
+                User.objects.create_user(
+                    username=f"serial.{index}",
+                    email=f"serial.{index}@example.com",
+                    first_name="Serial",
+                    # One blank last name so "" goes through both paths too.
+                    last_name=f"Row{index}" if index else "",
+                    password="pass1234",
+                    user_type=user_type,
+                )
+
+    def test_values_data_matches_model_serializer(self):
+        queryset = User.objects.order_by("username")
+        expected = [dict(row) for row in UserSummarySerializer(queryset, many=True).data]
+        with self.assertNumQueries(1):
+            self.assertEqual(UserSummarySerializer.values_data(queryset), expected)
+
+    def test_instance_only_fields_fall_back_to_model_serializer(self):
+        class DisplaySerializer(UserSummarySerializer):
+            display = serializers.SerializerMethodField()
+
+            class Meta(UserSummarySerializer.Meta):
+                fields = UserSummarySerializer.Meta.fields + ("display",)
+
+            def get_display(self, obj):
+                return obj.get_full_name()
+
+        queryset = User.objects.order_by("username")
+        data = DisplaySerializer.values_data(queryset)
+        expected = [dict(row) for row in DisplaySerializer(queryset, many=True).data]
+        self.assertEqual([dict(row) for row in data], expected)
+        self.assertEqual(data[0]["display"], "Serial ")
+        self.assertEqual(data[1]["display"], "Serial Row1")
+
+
+class EagerLoadingTests(TestCase):
+    def setUp(self):
+        with mute_profile_signals():
+            for index in range(5):
+                User.objects.create_user(
+                    username=f"eager.{index}", password="pass1234", user_type=User.UserType.LEADER
+                )
+
+    def test_profile_serializers_join_the_user(self):
+        class LeaderProfileSerializer(BaseProfileSerializer):
+            class Meta(BaseProfileSerializer.Meta):
+                model = _get_profile_model(User.UserType.LEADER)
+
+        serializer = LeaderProfileSerializer(LeaderProfileSerializer.Meta.model.objects.all(), many=True)
+        self.assertIsInstance(serializer, EagerListSerializer)
+        self.assertEqual(serializer.instance.query.select_related, {"user": {}})
+
+    def test_repeated_queries_are_flagged_in_debug(self):
+        class PeerCountSerializer(EagerLoadingMixin, UserSummarySerializer):
+            peers = serializers.SerializerMethodField()
+
+            class Meta(UserSummarySerializer.Meta):
+                fields = UserSummarySerializer.Meta.fields + ("peers",)
+                list_serializer_class = EagerListSerializer
+
+            def get_peers(self, obj):
+                return User.objects.filter(user_type=obj.user_type).count()
+
+        queryset = User.objects.order_by("username")
+        with override_settings(DEBUG=True), self.assertWarns(NPlusOneWarning):
+            PeerCountSerializer(queryset, many=True).data
+
+        with override_settings(DEBUG=False), warnings.catch_warnings():
+            warnings.simplefilter("error", NPlusOneWarning)
+            PeerCountSerializer(queryset, many=True).data
+
+
+class AdminUserExportTests(TestCase):
+    def setUp(self):
+        with mute_profile_signals():
+            self.staff = User.objects.create_user(
+                username="export.staff", password="pass1234", is_staff=True
+            )
+            for index in range(3):
+                User.objects.create_user(
+                    username=f"export.{index}",
+                    password="pass1234",
+                    user_type=User.UserType.LEADER,
+                    is_active=bool(index % 2),
+                )
+        self.url = reverse("admin_user_export")
+
+    def test_filters_accept_admin_changelist_params(self):
+        queryset = filter_users({"user_type__exact": "LEADER", "is_active": "0"})
+        self.assertEqual(
+            sorted(queryset.values_list("username", flat=True)), ["export.0", "export.2"]
+        )
+        with self.assertRaises(ExportFilterError):
+            filter_users({"is_staff": "maybe"})
+
+    def test_csv_export_streams_filtered_rows(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, {"user_type": "LEADER", "is_active": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith("id,username,email"))
+        self.assertEqual(len(lines), 2)
+        self.assertIn("export.1", lines[1])
+
+    def test_csv_cells_cannot_start_formulas(self):
+        with mute_profile_signals():
+            User.objects.create_user(
+                username="-export.formula",
+                first_name="=HYPERLINK(\"http://example.com\")",
+                last_name="@SUM(1)",
+                password="pass1234",
+            )
+        rows = export_rows(User.objects.filter(username="-export.formula"))
+        header, row = csv.reader(io.StringIO("".join(stream_csv(rows))))
+        row = dict(zip(header, row))
+        self.assertEqual(row["username"], "'-export.formula")
+        self.assertEqual(row["first_name"], "'=HYPERLINK(\"http://example.com\")")
+        self.assertEqual(row["last_name"], "'@SUM(1)")
+        self.assertEqual(row["email"], "")
+
+    @override_settings(USER_EXPORT_ORGANIZATION_FIELD="no_such_field")
+    def test_unknown_organization_field_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            list(export_rows(User.objects.all()))
+
+    def test_json_export_and_permissions(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, {"format": "json", "user_type": "FACULTY"})
+        self.assertEqual(b"".join(response.streaming_content), b"[]")
+        self.assertEqual(self.client.get(self.url, {"format": "xml"}).status_code, 400)
+
+        self.client.force_login(User.objects.get(username="export.1"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_bad_parameters_are_not_echoed(self):
+        self.client.force_login(self.staff)
+        payload = "<script>alert(1)</script>"
+        for params in ({"format": payload}, {"user_type": payload}, {"is_staff": payload}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response["Content-Type"], "application/json")
+            self.assertNotIn(b"<script>", response.content)
+            self.assertIn("error", response.json())
+
+
+class UserSearchTests(OrganizationFixtureMixin, TestCase):
+    def setUp(self):
+        with mute_profile_signals():
+            self.zoe = User.objects.create_user(
+                username="zoe.h",
+                email="zoe@camp.example.com",
+                first_name="Zoë",
+                last_name="Hart",
+                password="pass1234",
+            )
+            User.objects.create_user(
+                username="zack.hill",
+                email="zack@camp.example.com",
+                first_name="Zack",
+                last_name="Hill",
+                password="pass1234",
+            )
+
+    def _search(self, query):
+        return sorted(search_users(User.objects.all(), query).values_list("username", flat=True))
+
+    def test_tokens_are_normalized_words(self):
+        self.assertEqual(
+            user_tokens("Zoe.H", "Zoe@Camp.example.com", "Zoë Ann", "Hart", "zoe-hart"),
+            {"zoe.h", "zoe@camp.example.com", "zoe", "ann", "hart", "zoe-hart"},
+        )
+
+    def test_short_terms_match_prefixes_and_long_terms_substrings(self):
+        self.assertEqual(self._search("ll"), [])
+        self.assertEqual(self._search("hil"), ["zack.hill"])
+        # Substrings only go through the PostgreSQL trigram index.
+        substrings = connection.vendor == "postgresql"
+        self.assertEqual(self._search("ill"), ["zack.hill"] if substrings else [])
+        self.assertEqual(
+            self._search("camp.example"), ["zack.hill", "zoe.h"] if substrings else []
+        )
+
+    def test_deleting_a_profile_keeps_tokens_the_user_still_has(self):
+        model = _get_profile_model(User.UserType.LEADER)
+        with mute_profile_signals():
+            user = User.objects.create_user(
+                username="hart-leader", password="pass1234", user_type=User.UserType.LEADER
+            )
+        # The slug matches the username.
+        profile = model.objects.create(
+            user=user, organization=self.organization, slug="hart-leader"
+        )
+        profile.delete()
+        self.assertEqual(self._search("hart-leader"), ["hart-leader"])
+
+    def test_prefix_terms_match_any_field(self):
+        self.assertEqual(self._search("h"), ["zack.hill", "zoe.h"])
+        self.assertEqual(self._search("ZOE"), ["zoe.h"])
+        self.assertEqual(self._search("zack@"), ["zack.hill"])
+        self.assertEqual(self._search("z hill"), ["zack.hill"])
+        self.assertEqual(self._search("nobody"), [])
+        self.assertEqual(self._search("  "), ["zack.hill", "zoe.h"])
+
+    def test_renames_are_reindexed(self):
+        self.zoe.last_name = "Stone"
+        self.zoe.save()
+        self.assertEqual(self._search("stone"), ["zoe.h"])
+        self.assertEqual(self._search("hart"), [])
+
+    def test_admin_user_list_filters_by_query(self):
+        self.client.force_login(self.zoe)
+        response = self.client.get(reverse("admin_user_list"), {"q": "hill"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [user.username for user in response.context["table"].data], ["zack.hill"]
+        )
+
+
+class QueryPlanAssertionsMixin:
+    """
+    ``assertUsesIndex`` fails when ``EXPLAIN`` shows a full scan of the
+    queryset's table. PostgreSQL disables sequential scans for the check, so
+    the tiny test tables do not make a scan look cheaper than the index.
+    """
+
+    full_scan_patterns = {
+        "sqlite": r"\bSCAN {table}\b(?! USING (?:COVERING )?INDEX)",
+        "postgresql": r"Seq Scan on {table}\b",
+        "mysql": r"\btype\W+ALL\b",
+    }
+
+    def assertUsesIndex(self, queryset, index_name=None):
+        table = queryset.model._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = queryset.explain()
+        pattern = self.full_scan_patterns.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f"No plan patterns for {connection.vendor}")
+        if re.search(pattern.format(table=re.escape(table)), plan):
+            self.fail(f"Full scan of {table}:\n{plan}\n{queryset.query}")
+        if index_name and connection.vendor != "mysql":
+            self.assertIn(index_name, plan)
+
+
+class UserIndexPlanTests(QueryPlanAssertionsMixin, TestCase):
+    def test_role_filters_use_the_composite_index(self):
+        self.assertUsesIndex(
+            User.objects.filter(user_type=User.UserType.LEADER, is_active=True).order_by("username"),
+            "user_role_active_username_idx",
+        )
+        self.assertUsesIndex(
+            User.objects.filter(user_type=User.UserType.FACULTY).order_by("username"),
+            "user_role_active_username_idx",
+        )
+
+    def test_dashboard_counts_read_the_composite_index(self):
+        self.assertUsesIndex(
+            User.objects.order_by().values("user_type", "is_active").annotate(total=Count("id")),
+            "user_role_active_username_idx",
+        )
+
+    def test_unactivated_accounts_use_the_partial_index(self):
+        cutoff = timezone.now()
+        self.assertUsesIndex(
+            User.objects.filter(is_active=False, is_new_user=True, date_joined__lt=cutoff)
+            .order_by("date_joined"),
+            "user_unactivated_joined_idx",
+        )
+
+    def test_staff_and_admin_filters_use_partial_indexes(self):
+        self.assertUsesIndex(
+            User.objects.filter(is_staff=True).order_by("username"), "user_staff_username_idx"
+        )
+        self.assertUsesIndex(
+            User.objects.filter(is_admin=True).order_by("username"), "user_admin_username_idx"
+        )
+
+    def test_email_conflict_lookup_uses_the_lower_index(self):
+        self.assertUsesIndex(
+            User.objects.annotate(email_lower=Lower("email")).filter(
+                email_lower__in=["taken@example.com"]
+            ),
+            "user_email_lower_idx",
+        )
+
+    def test_newest_users_widget_uses_the_joined_index(self):
+        paginator = KeysetPaginator(User.objects.all(), ("-date_joined",), 10)
+        queryset = paginator.queryset.order_by(*paginator._order_by())[:10]
+        self.assertUsesIndex(queryset, "user_joined_idx")
+
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        with mute_profile_signals():
+            for index in range(7):
+                User.objects.create_user(
+                    username=f"keyset.{index}",
+                    password="pass1234",
+                    user_type=User.UserType.OTHER,
+                )
+        self.paginator = KeysetPaginator(User.objects.all(), ("username",), 3)
+
+    def test_pages_forward_and_back_without_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            first = self.paginator.page()
+            second = self.paginator.page(first.next_cursor)
+            third = self.paginator.page(second.next_cursor)
+            back = self.paginator.page(third.previous_cursor)
+
+        def names(page):
+            return [user.username for user in page]
+
+        self.assertEqual(names(first), ["keyset.0", "keyset.1", "keyset.2"])
+        self.assertEqual(names(second), ["keyset.3", "keyset.4", "keyset.5"])
+        self.assertEqual(names(third), ["keyset.6"])
+        self.assertEqual(names(back), names(second))
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+        self.assertTrue(back.has_previous)
+        self.assertFalse(any("COUNT(" in query["sql"].upper() for query in queries))
+        self.assertEqual([first.number, second.number, third.number, back.number], [1, 2, 3, 2])
+        self.assertEqual((third.start_index(), third.end_index()), (7, 7))
+        self.assertIs(second.paginator, self.paginator)
+
+    def test_rendered_links_walk_the_admin_user_list(self):
+        with mute_profile_signals():
+            admin_user = User.objects.create_user(
+                username="keyset.admin", password="pass1234", is_admin=True
+            )
+        self.client.force_login(admin_user)
+        url = reverse("admin_user_list")
+
+        def links(response):
+            html = render_to_string(
+                "user/includes/keyset_pagination.html", response.context.flatten()
+            )
+            found = dict(re.findall(r'href="([^"]+)" rel="(\w+)"', html))
+            return {rel: url + unescape(href) for href, rel in found.items()}, html
+
+        with mock.patch.object(AdminUserListView, "paginate_by", 3):
+            first, html = links(self.client.get(url, {"order": "username"}))
+            self.assertIn("Page 1", html)
+            self.assertEqual(set(first), {"next"})
+            response = self.client.get(first["next"])
+            second, html = links(response)
+            self.assertIn("Page 2", html)
+            self.assertEqual(set(second), {"next", "prev"})
+            self.assertEqual(
+                [user.username for user in response.context["page_obj"]],
+                ["keyset.3", "keyset.4", "keyset.5"],
+            )
+            back, html = links(self.client.get(second["prev"]))
+            self.assertIn("Page 1", html)
+
+
+class UserCountsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_counts_are_cached_and_follow_saves_and_deletes(self):
+        with mute_profile_signals(), self.captureOnCommitCallbacks(execute=True):
+            leader = User.objects.create_user(
+                username="count.leader", password="pass1234", user_type=User.UserType.LEADER
+            )
+            other = User.objects.create_user(
+                username="count.other", password="pass1234", user_type=User.UserType.OTHER
+            )
+        self.assertEqual(get_user_counts()["total"], 2)
+
+        with mute_profile_signals(), self.captureOnCommitCallbacks(execute=True):
+            leader.is_active = False
+            leader.save()
+            other.delete()
+
+        with self.assertNumQueries(0):
+            counts = get_user_counts()
+        self.assertEqual(counts["total"], 1)
+        self.assertEqual(counts["inactive"], 1)
+        self.assertEqual(counts["by_role"][User.UserType.LEADER]["inactive"], 1)
+        self.assertEqual(counts["by_role"][User.UserType.OTHER]["total"], 0)
+
+
+class OrganizationCountsTests(OrganizationFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.organization_id = cls.organization.pk
+
+    def test_deltas_upsert_and_read_back(self):
+        adjust_organization_count(self.organization_id, User.UserType.LEADER, True, 1)
+        adjust_organization_count(self.organization_id, User.UserType.LEADER, True, 2)
+        adjust_organization_count(self.organization_id, User.UserType.LEADER, False, 1)
+        adjust_organization_count(self.organization_id, User.UserType.ATTENDEE, True, 4)
+        adjust_organization_count(self.organization_id, User.UserType.ATTENDEE, True, -1)
+
+        with self.assertNumQueries(1):
+            counts = get_organization_counts(self.organization_id)
+        self.assertEqual(counts["total"], 7)
+        self.assertEqual(counts["by_role"][User.UserType.LEADER]["active"], 3)
+        self.assertEqual(counts["by_role"][User.UserType.LEADER]["inactive"], 1)
+        self.assertEqual(
+            get_organization_role_count(self.organization_id, User.UserType.ATTENDEE, active=True), 3
+        )
+        self.assertEqual(get_organization_role_count(self.organization_id, User.UserType.FACULTY), 0)
+
+    def test_decrement_without_row_is_ignored(self):
+        adjust_organization_count(self.organization_id, User.UserType.LEADER, True, -1)
+        self.assertEqual(get_organization_counts(self.organization_id)["total"], 0)
+
+    def _leader_with_profile(self):
+        with mute_profile_signals():
+            user = User.objects.create_user(
+                username="counted.leader", password="pass1234", user_type=User.UserType.LEADER
+            )
+        _get_profile_model(User.UserType.LEADER).objects.create(
+            user=user, organization_id=self.organization_id, slug="counted-leader"
+        )
+        self.assertEqual(self._leader_counts()["active"], 1)
+        return user
+
+    def _leader_counts(self):
+        return get_organization_counts(self.organization_id)["by_role"][User.UserType.LEADER]
+
+    def test_status_change_with_loaded_profile_moves_counts_in_place(self):
+        user = self._leader_with_profile()
+        user = User.objects.with_profiles().get(pk=user.pk)
+        user.is_active = False
+        with self.captureOnCommitCallbacks():
+            user.save()
+        self.assertEqual((self._leader_counts()["active"], self._leader_counts()["inactive"]), (0, 1))
+
+    def test_status_change_without_loaded_profile_moves_counts_in_one_update(self):
+        user = self._leader_with_profile()
+        user = User.objects.get(pk=user.pk)
+        user.is_active = False
+        # The user UPDATE, then one counter UPDATE finding the profile by subquery.
+        with self.assertNumQueries(2):
+            user.save()
+        self.assertEqual((self._leader_counts()["active"], self._leader_counts()["inactive"]), (0, 1))
+
+    def test_status_change_rolls_back_with_the_save(self):
+        user = User.objects.get(pk=self._leader_with_profile().pk)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            user.is_active = False
+            user.save()
+            raise RuntimeError
+        self.assertEqual((self._leader_counts()["active"], self._leader_counts()["inactive"]), (1, 0))
+
+
+class MailWorkerTests(TestCase):
+    backend = "django.core.mail.backends.locmem.EmailBackend"
+
+    def _message(self, index):
+        return EmailMessage("Subject", "Body", "from@example.com", [f"to{index}@example.com"])
+
+    def test_batches_share_one_connection(self):
+        worker = MailWorker(maxsize=20, batch_size=5, backend=self.backend)
+        self.addCleanup(worker.close)
+        with mock.patch("user.mail.get_connection", wraps=get_connection) as opened:
+            for index in range(12):
+                self.assertTrue(worker.submit(self._message(index)))
+            worker.flush()
+
+        self.assertEqual(len(mail.outbox), 12)
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(worker.stats(), {"sent": 12, "failed": 0, "rejected": 0, "queue_depth": 0})
+
+    def test_full_queue_rejects_after_timeout(self):
+        worker = MailWorker(maxsize=1, batch_size=1, submit_timeout=1, backend=self.backend)
+        release = threading.Event()
+        original = worker._deliver
+
+        def _blocked(batch):
+            release.wait(5)
+            original(batch)
+
+        worker._deliver = _blocked
+        self.addCleanup(worker.close)
+        self.addCleanup(release.set)
+
+        self.assertTrue(worker.submit(self._message(1)))
+        self.assertTrue(worker.submit(self._message(2)))
+        worker.submit_timeout = 0.01
+        self.assertFalse(worker.submit(self._message(3)))
+        self.assertEqual(worker.stats()["rejected"], 1)
+
+        release.set()
+        worker.flush()
+        self.assertEqual(len(mail.outbox), 2)
+
+
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.worker = MailWorker(backend="django.core.mail.backends.locmem.EmailBackend")
+        self.addCleanup(self.worker.close)
+        with mute_profile_signals():
+            self.user = User.objects.create_user(
+                username="outbox.user",
+                email="outbox@example.com",
+                password="pass1234",
+                user_type=User.UserType.OTHER,
+                is_active=False,
+            )
+
+    def test_registration_enqueues_and_drain_sends_once(self):
+        row = EmailOutbox.objects.get(user=self.user)
+        self.assertEqual(row.status, EmailOutbox.Status.PENDING)
+        self.assertEqual(mail.outbox, [])
+
+        result = drain_outbox(worker=self.worker)
+        self.assertEqual(result["sent"], 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["outbox@example.com"])
+        row.refresh_from_db()
+        self.assertEqual(row.status, EmailOutbox.Status.SENT)
+
+        self.assertEqual(drain_outbox(worker=self.worker)["claimed"], 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failed_delivery_backs_off(self):
+        with mock.patch.object(self.worker, "_send_one", return_value=False):
+            result = drain_outbox(worker=self.worker)
+        self.assertEqual(result["retrying"], 1)
+        row = EmailOutbox.objects.get(user=self.user)
+        self.assertEqual(row.attempts, 1)
+        self.assertEqual(row.status, EmailOutbox.Status.PENDING)
+        self.assertEqual(drain_outbox(worker=self.worker)["claimed"], 0)
+
+
+class ActivationRenderingTests(TestCase):
+    def test_batch_rendering_matches_single_message(self):
+        users = [
+            User(pk=index, username=f"render.{index}", email=f"render{index}@example.com")
+            for index in (1, 2)
+        ]
+        bodies = render_activation_bodies(users, "https://camp.example")
+        self.assertEqual(len(bodies), 2)
+        for user, body in zip(users, bodies):
+            self.assertEqual(build_activation_message(user, "https://camp.example").body, body)
+            uid = urlsafe_base64_encode(force_bytes(user.pk))
+            self.assertIn(f"https://camp.example{reverse('activate', args=[uid, 'x'])[:-2]}", body)
+
+
+class CachedModelBackendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_auth_cache_stats()
+        self.addCleanup(cache.clear)
+        with mute_profile_signals():
+            self.user = User.objects.create_user(
+                username="cached.auth",
+                password="pass1234",
+                user_type=User.UserType.LEADER,
+                is_admin=True,
+            )
+        self.backend = CachedModelBackend()
+
+    def test_second_lookup_is_served_from_cache(self):
+        self.assertEqual(self.backend.get_user(self.user.pk), self.user)
+        with self.assertNumQueries(0):
+            cached = self.backend.get_user(self.user.pk)
+            self.assertEqual(cached.username, "cached.auth")
+            self.assertTrue(cached.is_admin)
+            self.assertEqual(cached.get_session_auth_hash(), self.user.get_session_auth_hash())
+        self.assertEqual(get_auth_cache_stats(), {"hits": 1, "misses": 1})
+
+    def test_save_invalidates_entry(self):
+        self.backend.get_user(self.user.pk)
+        with mute_profile_signals():
+            self.user.first_name = "Renamed"
+            self.user.save()
+        self.assertEqual(self.backend.get_user(self.user.pk).first_name, "Renamed")
+        self.assertEqual(get_auth_cache_stats()["misses"], 2)
+
+    def test_password_hash_is_not_cached(self):
+        self.backend.get_user(self.user.pk)
+        values, session_hash = cache.get(f"user:auth:2:{self.user.pk}")
+        self.assertNotIn(self.user.password, values)
+        self.assertEqual(session_hash, self.user.get_session_auth_hash())
+
+        cached = self.backend.get_user(self.user.pk)
+        self.assertNotIn("password", cached.__dict__)
+        cached.set_password("changed5678")
+        self.assertNotEqual(cached.get_session_auth_hash(), session_hash)
+
+    @override_settings(AUTHENTICATION_BACKENDS=["user.backends.CachedModelBackend"])
+    def test_password_change_ends_cached_sessions(self):
+        self.client.force_login(self.user)
+        url = reverse("account_settings")
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(get_auth_cache_stats(), {"hits": 1, "misses": 1})
+
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password("changed5678")
+        user.save(update_fields=["password"])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("login", response["Location"])
+
+    @override_settings(USER_AUTH_CACHE_ENABLED=False)
+    def test_toggle_disables_cache(self):
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(1):
+            self.backend.get_user(self.user.pk)
+
+
+class _StubProfileForm(forms.Form):
+    organization = forms.CharField()
+
+    def save(self, commit=True):
+        return _get_profile_model(User.UserType.LEADER)(
+            organization_id=self.cleaned_data["organization"]
+        )
+
+
+class RegisterViewTests(OrganizationFixtureMixin, TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(RegisterView.profile_map, {"Leader": (_StubProfileForm, None)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.data = {
+            "username": "new.leader",
+            "email": "new.leader@example.com",
+            "password1": "S3cure-pass-9876",
+            "password2": "S3cure-pass-9876",
+            "user_type": "Leader",
+        }
+
+    def _inserts(self, queries):
+        """Number of INSERT statements per model written by the registration."""
+        models = (User, _get_profile_model(User.UserType.LEADER), EmailOutbox, UserSearchToken)
+        return {
+            model: sum(
+                query["sql"].lstrip().startswith(
+                    f"INSERT INTO {connection.ops.quote_name(model._meta.db_table)}"
+                )
+                for query in queries
+            )
+            for model in models
+        }
+
+    def test_invalid_profile_writes_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("register"), self.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(self._inserts(queries).values()), {0})
+        self.assertFalse(User.objects.filter(username="new.leader").exists())
+
+    def test_valid_registration_writes_user_profile_and_outbox_once(self):
+        with mock.patch.object(
+            RegisterView, "save_profile", autospec=True, side_effect=RegisterView.save_profile
+        ) as save_profile:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    reverse("register"), {**self.data, "organization": self.organization.pk}
+                )
+        self.assertEqual(response.status_code, 302)
+        user = User.objects.get(username="new.leader")
+        self.assertEqual(user.user_type, User.UserType.LEADER)
+        self.assertFalse(user.is_active)
+        save_profile.assert_called_once()
+        inserts = self._inserts(queries)
+        # ensure_profile added no second profile.
+        self.assertEqual(inserts[User], 1)
+        self.assertEqual(inserts[_get_profile_model(User.UserType.LEADER)], 1)
+        self.assertEqual(inserts[EmailOutbox], 1)
+        self.assertEqual(user.get_profile().slug, "newleader")
+        self.assertEqual(EmailOutbox.objects.filter(user=user).count(), 1)
+
+
+class FindUserConflictsTests(TestCase):
+    def test_reports_db_and_in_batch_conflicts_in_one_query(self):
+        with mute_profile_signals():
+            existing = User.objects.create_user(
+                username="troop.taken",
+                email="taken@example.com",
+                password="pass1234",
+                user_type=User.UserType.OTHER,
+            )
+        entries = [
+            ("troop.taken", "fresh1@example.com", None),
+            ("troop.new", "taken@example.com", None),
+            ("troop.new", "fresh2@example.com", None),
+            ("troop.taken", "taken@example.com", existing.pk),
+            ("troop.other", "FRESH1@example.com", None),
+        ]
+        with self.assertNumQueries(1):
+            conflicts = find_user_conflicts(entries)
+
+        self.assertEqual(conflicts[0], [("username", "Username is already taken.")])
+        self.assertEqual(conflicts[1], [("email", "Email is already in use.")])
+        self.assertEqual(conflicts[2], [("username", "Username is repeated in this submission.")])
+        self.assertEqual(
+            conflicts[3],
+            [
+                ("username", "Username is repeated in this submission."),
+                ("email", "Email is repeated in this submission."),
+            ],
+        )
+        self.assertEqual(conflicts[4], [("email", "Email is repeated in this submission.")])
+
+    def test_existing_emails_match_case_insensitively(self):
+        with mute_profile_signals():
+            existing = User.objects.create_user(
+                username="troop.mixed",
+                email="Mixed.Case@Example.com",
+                password="pass1234",
+                user_type=User.UserType.OTHER,
+            )
+        entries = [
+            ("troop.one", "mixed.case@example.com", None),
+            ("troop.mixed", "MIXED.CASE@EXAMPLE.COM", existing.pk),
+        ]
+        with self.assertNumQueries(1):
+            conflicts = find_user_conflicts(entries)
+        self.assertEqual(conflicts[0], [("email", "Email is already in use.")])
+        self.assertEqual(conflicts[1], [("email", "Email is repeated in this submission.")])
+
+
+class UsernameAvailabilityTests(TestCase):
+    def setUp(self):
+        username_index.reset()
+        self.addCleanup(username_index.reset)
+        # A build thread would not see this test's uncommitted rows.
+        patcher = mock.patch.object(username_index, "_start_rebuild", username_index._rebuild)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with mute_profile_signals():
+            User.objects.create_user(
+                username="already.here", password="pass1234", user_type=User.UserType.OTHER
+            )
+        self.url = reverse("username_availability")
+
+    def test_reports_taken_and_free_names(self):
+        response = self.client.get(self.url, {"username": "already.here"})
+        self.assertEqual(response.json(), {"username": "already.here", "available": False})
+        response = self.client.get(self.url, {"username": "brand.new"})
+        self.assertEqual(response.json(), {"username": "brand.new", "available": True})
+
+    def test_new_users_are_indexed_by_post_save(self):
+        self.assertTrue(username_index.is_taken("already.here"))
+        with mute_profile_signals():
+            User.objects.create_user(
+                username="just.joined", password="pass1234", user_type=User.UserType.OTHER
+            )
+        self.assertTrue(username_index.is_taken("just.joined"))
+
+    def test_catch_up_counts_rows_added_by_post_save_once(self):
+        username_index.is_taken("already.here")
+        count = username_index._filter.count
+        with mute_profile_signals():
+            User.objects.create_user(
+                username="counted.once", password="pass1234", user_type=User.UserType.OTHER
+            )
+        self.assertEqual(username_index._filter.count, count)
+        with mock.patch.object(username_index, "refresh_interval", 0):
+            self.assertTrue(username_index.is_taken("counted.once"))
+        self.assertEqual(username_index._filter.count, count + 1)
+
+    def test_build_runs_outside_the_lock(self):
+        build = username_index._build
+        seen = {}
+
+        def _build():
+            # Another request during the build neither blocks nor sees a half-built filter.
+            reader = threading.Thread(
+                target=lambda: seen.update(filter=username_index._ready_filter())
+            )
+            reader.start()
+            reader.join(timeout=5)
+            seen["blocked"] = reader.is_alive()
+            username_index.add("added.meanwhile")
+            return build()
+
+        with mock.patch.object(username_index, "_build", _build):
+            username_index._ready_filter()
+        self.assertEqual(seen, {"filter": None, "blocked": False})
+        self.assertIn("added.meanwhile", username_index._filter)
+
+    def test_first_check_goes_to_the_database_while_the_filter_builds(self):
+        with mock.patch.object(username_index, "_start_rebuild") as start_rebuild:
+            with self.assertNumQueries(1):
+                self.assertTrue(username_index.is_taken("already.here"))
+            with self.assertNumQueries(1):
+                self.assertFalse(username_index.is_taken("brand.new"))
+        start_rebuild.assert_called_once()
+        self.assertIsNone(username_index._filter)
+
+    def test_rebuild_picks_up_names_renamed_elsewhere(self):
+        self.assertFalse(username_index.is_taken("renamed.elsewhere"))
+        # Same id and no post_save, so a catch-up cannot see it.
+        User.objects.filter(username="already.here").update(username="renamed.elsewhere")
+        with mock.patch.object(username_index, "refresh_interval", 0):
+            self.assertFalse(username_index.is_taken("renamed.elsewhere"))
+        with mock.patch.object(username_index, "rebuild_interval", 0):
+            self.assertTrue(username_index.is_taken("renamed.elsewhere"))
+
+    def test_invalid_username_is_rejected(self):
+        response = self.client.get(self.url, {"username": "bad name!"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        for index in range(1000):
+            bloom.add(f"user{index}")
+        self.assertTrue(all(f"user{index}" in bloom for index in range(1000)))
+        self.assertLess(sum(f"other{index}" in bloom for index in range(1000)), 50)
+
+
+class ModelsImportTests(SimpleTestCase):
+    """
+    ``python -X importtime`` budget for a bare ``import user.models``. The
+    subprocess loads the settings and moves the user app right behind the
+    ``django.contrib`` apps, so no other project app has imported the
+    deferred modules first. The best of a few runs is compared with
+    ``USER_MODELS_IMPORT_BUDGET_MS``, to ride out a busy machine.
+    """
+
+    budget_ms = float(os.environ.get("USER_MODELS_IMPORT_BUDGET_MS", 150))
+    runs = 3
+    deferred_modules = {
+        "enrollment.models.enrollment",
+        "facility.managers.faculty",
+        "faction.managers.attendee",
+        "faction.managers.leader",
+        "facility.forms.faculty",
+        "faction.forms.attendee",
+        "faction.forms.leader",
+    }
+    script = (
+        "import django\n"
+        "from django.conf import settings\n"
+        "installed = list(settings.INSTALLED_APPS)\n"
+        "user_app = next(app for app in installed if app.split('.')[0] == 'user')\n"
+        "installed.remove(user_app)\n"
+        "contrib = [app for app in installed if app.startswith('django.')]\n"
+        "rest = [app for app in installed if not app.startswith('django.')]\n"
+        "settings.INSTALLED_APPS = contrib + [user_app] + rest\n"
+        "django.setup()\n"
+    )
+
+    def _import_tree(self):
+        """``(depth, module, cumulative µs)`` rows in importtime order."""
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", self.script],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+        )
+        rows = []
+        for line in result.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) != 3 or not parts[1].strip().isdigit():
+                continue
+            name = parts[2].rstrip()
+            rows.append((len(name) - len(name.lstrip()), name.strip(), int(parts[1])))
+        return rows
+
+    def _user_models(self, rows):
+        """
+        Cumulative µs of ``user.models`` and every module imported up to it,
+        its own imports included: importtime lists a module after its children.
+        """
+        index = next(i for i, row in enumerate(rows) if row[1] == "user.models")
+        return rows[index][2], {name for _depth, name, _cumulative in rows[:index]}
+
+    def test_user_models_import_within_budget(self):
+        timings = []
+        for _run in range(self.runs):
+            cumulative_us, loaded = self._user_models(self._import_tree())
+            self.assertEqual(loaded & self.deferred_modules, set())
+            timings.append(cumulative_us / 1000)
+        self.assertLess(min(timings), self.budget_ms)
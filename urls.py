@@ -13,10 +13,17 @@ urlpatterns = [
     path("register/faculty/", RegisterFacultyView.as_view(), name="register_faculty"),
     path("activate/<uidb64>/<token>/", views.activate_user, name="activate"),
     path("signup", views.RegisterView.as_view(), name="signup"),
+    path(
+        "username-available",
+        views.username_availability,
+        name="username_availability",
+    ),
     path("profile/", views.DashboardView.as_view(), name="profile"),
     #path("dashboard", views.DashboardView.as_view(), name="dashboard"),
     path("admin-portal/", views.AdminDashboardView.as_view(), name="admin_portal_dashboard"),
     path("admin/users/", views.AdminUserListView.as_view(), name="admin_user_list"),
+    # Before the <username> routes so "export" is not taken for a username.
+    path("admin/users/export/", views.AdminUserExportView.as_view(), name="admin_user_export"),
     path(
         "admin/users/<str:username>/",
         views.AdminUserDetailView.as_view(),
@@ -6,14 +6,20 @@ from django.contrib import messages
 from django.contrib.auth import login as _login, logout as _logout, authenticate
 from django.contrib.auth.views import LogoutView as _LogoutView, LoginView as _LoginView
 from django.contrib.auth.forms import AuthenticationForm
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.tokens import default_token_generator
-from django.views.generic import TemplateView, DetailView
+from django.views.decorators.http import require_GET
+from django.views.generic import TemplateView, DetailView, View
 from django.views.generic.edit import UpdateView
 
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect
 from django.urls import reverse_lazy, reverse, NoReverseMatch
+from django.utils.functional import SimpleLazyObject
 from django.utils.http import urlsafe_base64_decode
+from django.utils.module_loading import import_string
 
 from django.views.generic.edit import FormView
 from django.utils.translation import gettext_lazy as _
@@ -24,15 +30,14 @@ from django.contrib.contenttypes.models import ContentType
 from core.views.base import BaseDashboardView, BaseTableListView
 from user.tables import AdminUserTable
 
-from facility.forms.faculty import FacultyForm
-from faction.forms.attendee import AttendeeProfileForm
-from faction.forms.leader import LeaderProfileForm
-from facility.models.faculty import FacultyProfile
-from faction.models.leader import LeaderProfile
-from faction.models.attendee import AttendeeProfile
-
+from .availability import is_username_available
+from .export import ExportFilterError, export_rows, filter_users, stream_csv, stream_json
 from .forms import RegistrationForm, AdminUserForm
 from .models import User
+from .pagination import InvalidCursor, KeysetPaginationMixin, KeysetPaginator
+from .routes import cached_reverse, get_faculty_facility_slug
+from .search import search_users
+from .stats import get_user_counts
 
 logger = logging.getLogger(__name__)
 
@@ -46,7 +51,7 @@ def activate_user(request, uidb64, token):
 
     if user and default_token_generator.check_token(user, token):
         user.is_active = True
-        user.save()
+        user.save(update_fields=["is_active"])
         messages.success(request, "Your account has been activated successfully.")
         return redirect("login")
 
@@ -54,6 +59,23 @@ def activate_user(request, uidb64, token):
     return redirect("register")
 
 
+@require_GET
+def username_availability(request):
+    """JSON ``{"username", "available"}`` for live signup form checks."""
+    username = request.GET.get("username", "").strip()
+    max_length = User._meta.get_field("username").max_length
+    try:
+        if not username or len(username) > max_length:
+            raise ValidationError(f"Enter a username of 1 to {max_length} characters.")
+        User.username_validator(username)
+    except ValidationError as exc:
+        return JsonResponse(
+            {"username": username, "available": False, "error": " ".join(exc.messages)},
+            status=400,
+        )
+    return JsonResponse({"username": username, "available": is_username_available(username)})
+
+
 class LoginView(_LoginView):
     template_name = "auth/signin.html"
     form_class = AuthenticationForm
@@ -71,23 +93,59 @@ class LoginView(_LoginView):
 
 
 class RegisterView(FormView):
+    """
+    Validate the account form and the selected role's profile form before
+    writing anything, then create the user and its profile in one transaction.
+    """
+
     template_name = "signup.html"
     form_class = RegistrationForm
     success_url = reverse_lazy("success_url")
 
+    # Dotted paths are imported on first use; classes are accepted as well.
     profile_map = {
-        "Attendee": (AttendeeProfileForm, AttendeeProfile),
-        "Leader": (LeaderProfileForm, LeaderProfile),
-        "Faculty": (FacultyForm, FacultyProfile),
+        "Attendee": ("faction.forms.attendee.AttendeeProfileForm", "faction.AttendeeProfile"),
+        "Leader": ("faction.forms.leader.LeaderProfileForm", "faction.LeaderProfile"),
+        "Faculty": ("facility.forms.faculty.FacultyForm", "facility.FacultyProfile"),
+    }
+    role_user_types = {
+        "Attendee": User.UserType.ATTENDEE,
+        "Leader": User.UserType.LEADER,
+        "Faculty": User.UserType.FACULTY,
     }
+    default_role = "Attendee"
+
+    def get_role(self):
+        role = self.request.POST.get("user_type") or self.request.GET.get("role")
+        return role if role in self.profile_map else self.default_role
+
+    def get_profile_form_class(self, role):
+        form_class = self.profile_map[role][0]
+        return import_string(form_class) if isinstance(form_class, str) else form_class
+
+    def get_profile_form(self, role):
+        """The selected role's profile form, built once and bound on POST."""
+        if getattr(self, "_profile_form_role", None) != role:
+            ProfileFormClass = self.get_profile_form_class(role)
+            self._profile_form = ProfileFormClass(self.request.POST or None)
+            self._profile_form_role = role
+        return self._profile_form
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        POST = self.request.POST or None
-
-        context["attendee_form"] = AttendeeProfileForm(POST)
-        context["leader_form"] = LeaderProfileForm(POST)
-        context["faculty_form"] = FacultyForm(POST)
+        role = self.get_role()
+        context["role"] = role
+        context["profile_form"] = self.get_profile_form(role)
+
+        # Forms of the other roles are only built if the template renders them.
+        for name in self.profile_map:
+            key = f"{name.lower()}_form"
+            if name == role:
+                context[key] = context["profile_form"]
+            else:
+                context[key] = SimpleLazyObject(
+                    lambda name=name: self.get_profile_form_class(name)()
+                )
 
         # If AddressForm is later implemented, add here:
         # context["address_form"] = AddressForm(POST)
@@ -95,29 +153,26 @@ class RegisterView(FormView):
         return context
 
     def form_valid(self, form):
-        user = User.objects.create_user(
-            username=form.cleaned_data["username"],
-            email=form.cleaned_data["email"],
-            password=form.cleaned_data["password"],
-        )
-
-        role = form.cleaned_data.get("user_type")
-        ProfileFormClass, ProfileModel = self.profile_map.get(role)
-
-        profile_form = ProfileFormClass(self.request.POST)
+        role = form.cleaned_data["user_type"]
+        profile_form = self.get_profile_form(role)
 
         # Address form commented out until implemented
         # address_form = AddressForm(self.request.POST)
 
-        if profile_form.is_valid():
-            profile = self.save_profile(user, profile_form)
-            return super().form_valid(form)
-
-        for field, errors in profile_form.errors.items():
-            for error in errors:
-                messages.error(self.request, f"{field}: {error}")
-
-        return self.form_invalid(form)
+        if not profile_form.is_valid():
+            for field, errors in profile_form.errors.items():
+                for error in errors:
+                    messages.error(self.request, f"{field}: {error}")
+            return self.form_invalid(form)
+
+        with transaction.atomic():
+            user = form.save(commit=False)
+            user.user_type = self.role_user_types[role]
+            # save_profile() inserts the profile; ensure_profile must not add another.
+            user.manages_own_profile = True
+            user.save()
+            self.save_profile(user, profile_form)
+        return super().form_valid(form)
 
     def save_profile(self, user, form):
         profile = form.save(commit=False)
@@ -150,35 +205,35 @@ class DashboardView(LoginRequiredMixin, BaseDashboardView):
         user = request.user
 
         if user.is_superuser:
-            return redirect(reverse_lazy("admin_portal_dashboard"))
+            return redirect(cached_reverse("admin_portal_dashboard"))
 
         redirect_url = self.get_dashboard_redirect_url(user)
         if redirect_url:
             return redirect(redirect_url)
 
         logger.warning(f"No dashboard found for user type: {user.user_type}")
-        return redirect(reverse_lazy("home"))
+        return redirect(cached_reverse("home"))
 
     def get_dashboard_redirect_url(self, user):
+        """
+        Resolve from the reverse-once route table; faculty cost at most one
+        query, on a facility slug cache miss.
+        """
         override = getattr(user, "dashboard_route", None)
         if callable(override):
             override = override()
         if override:
-            return reverse_lazy(override)
+            return cached_reverse(override)
 
-        role = getattr(user, "user_type", "").lower()
+        role = (getattr(user, "user_type", "") or "").lower()
         if role == "faculty":
-            from core.utils import get_faculty_profile
-
-            profile = get_faculty_profile(user)
-            facility = getattr(profile, "facility", None)
-            if facility:
-                return reverse_lazy(
-                    "facilities:faculty:dashboard",
-                    kwargs={"facility_slug": facility.slug},
+            facility_slug = get_faculty_facility_slug(user)
+            if facility_slug:
+                return cached_reverse(
+                    "facilities:faculty:dashboard", facility_slug=facility_slug
                 )
             return None
-        return reverse_lazy(self.dashboard_redirects.get(role, "home"))
+        return cached_reverse(self.dashboard_redirects.get(role, "home"))
 
 
 class AdminDashboardView(LoginRequiredMixin, BaseDashboardView):
@@ -215,22 +270,85 @@ class AdminDashboardView(LoginRequiredMixin, BaseDashboardView):
             ]
         }
 
+    admin_users_widget_size = 10
+
     def get_admin_users_widget(self, _definition):
+        paginator = KeysetPaginator(
+            User.objects.with_profiles(), ("-date_joined",), self.admin_users_widget_size
+        )
+        try:
+            page = paginator.page(self.request.GET.get("users_cursor"))
+        except InvalidCursor:
+            page = paginator.page()
+
+        def _url(cursor):
+            if cursor is None:
+                return None
+            params = self.request.GET.copy()
+            params["users_cursor"] = cursor
+            return f"?{params.urlencode()}"
+
         return {
             "table_class": AdminUserTable,
-            "queryset": User.objects.order_by("username"),
+            "queryset": page.object_list,
+            "next_url": _url(page.next_cursor),
+            "previous_url": _url(page.previous_cursor),
+            "counts": get_user_counts(),
         }
 
 
-class AdminUserListView(LoginRequiredMixin, BaseTableListView):
+class AdminUserListView(LoginRequiredMixin, KeysetPaginationMixin, BaseTableListView):
     model = User
     table_class = AdminUserTable
     template_name = "admin/user_list.html"
     context_object_name = "users"
     paginate_by = 25
 
+    search_param = "q"
+
+    def get_search_query(self):
+        return self.request.GET.get(self.search_param, "").strip()
+
     def get_queryset(self):
-        return User.objects.order_by("username")
+        queryset = User.objects.with_profiles().order_by("username")
+        return search_users(queryset, self.get_search_query())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["search_query"] = self.get_search_query()
+        return context
+
+
+class AdminUserExportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Stream every matching user with its role profile as CSV (default) or
+    ``?format=json``. Accepts the ``UserAdmin.list_filter`` parameters, so a
+    Django admin changelist query string can be reused as is.
+    """
+
+    formats = {
+        "csv": ("text/csv", stream_csv),
+        "json": ("application/json", stream_json),
+    }
+
+    def test_func(self):
+        user = self.request.user
+        return user.is_superuser or user.is_staff or user.is_admin
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get("format", "csv")
+        if export_format not in self.formats:
+            formats = ", ".join(self.formats)
+            return JsonResponse({"error": f"format must be one of: {formats}."}, status=400)
+        try:
+            queryset = filter_users(request.GET)
+        except ExportFilterError as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+
+        content_type, encode = self.formats[export_format]
+        response = StreamingHttpResponse(encode(export_rows(queryset)), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="users.{export_format}"'
+        return response
 
 
 class SettingsView(LoginRequiredMixin, TemplateView):